@@ -0,0 +1,197 @@
+import argparse, asyncio, json, resource, sys, time
+from cogs.moderation import (
+    INFERENCE_BATCH, INFERENCE_DELAY, MODEL_DIR, PROHIBITED_EXTENSIONS, REMOVE_WORDS_PATH,
+    SCORE_CACHE_SIZE, SCORE_CACHE_TTL, normalize
+)
+from helpers.inference import BatchInference, ResultCache, content_key
+from helpers.moderation_model import current_rss, load_model_dir
+from helpers.moderation_rules import RulePipeline, ExtensionRule, IPAddressRule, WordFilterRule, ClassifierRule
+from helpers.wordfilter import WordList
+
+# Offline moderation benchmark: replays a corpus through the rule pipeline
+# Moderation.on_message runs (extension and IP rules, the word filter, then the
+# model's vectorizer and predict_proba) without Discord, using stand-in messages.
+#
+#   python -m benchmarks.moderation corpus.jsonl [--mode both] [--model data/models/<version>]
+#
+# The corpus has one JSON object per line: {"content": "..."} plus optional
+# "bot": true, "mentions": <count> and "attachments": ["file.exe", ...].
+#
+# Modes:
+#   unbatched  one message at a time, the model called once per message
+#   batched    --concurrency messages in flight, scored through BatchInference with
+#              the cog's batch size and delay, as in production
+# Each reports messages/sec, p50/p95/p99 latency per message, peak RSS and how many
+# messages were deleted, flagged or left alone. --json prints one JSON object per
+# mode so results can be compared between runs.
+
+class FakeAuthor:
+    def __init__(self, bot=False):
+        self.bot = bot
+
+class FakeAttachment:
+    def __init__(self, filename):
+        self.filename = filename
+
+class FakeMessage:
+    """The parts of discord.Message the moderation rules read."""
+    def __init__(self, content, bot=False, mentions=0, attachments=()):
+        self.content = content
+        self.author = FakeAuthor(bot)
+        self.mentions = [object()] * mentions
+        self.attachments = [FakeAttachment(filename) for filename in attachments]
+
+def load_corpus(path, limit=None):
+    messages = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            messages.append(FakeMessage(
+                record.get("content", record.get("text", "")),
+                bool(record.get("bot", False)),
+                int(record.get("mentions", 0)),
+                record.get("attachments", ()),
+            ))
+            if limit is not None and len(messages) >= limit:
+                break
+    return messages
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+def peak_rss():
+    """Peak resident memory of this process in bytes (Linux reports ru_maxrss in KB)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def build_pipeline(word_filter, score, threshold):
+    return RulePipeline([
+        ExtensionRule(PROHIBITED_EXTENSIONS),
+        IPAddressRule(),
+        WordFilterRule(word_filter),
+        ClassifierRule(score, threshold),
+    ])
+
+async def replay(messages, model, word_filter, args, batched):
+    inference = None
+    cache = ResultCache(SCORE_CACHE_SIZE, SCORE_CACHE_TTL) if args.cache else None
+
+    if batched:
+        inference = BatchInference(model.predict, args.batch_size, args.batch_delay)
+
+        async def predict(text):
+            return await inference.score(text)
+    else:
+        async def predict(text):
+            return model.predict([text])[0]
+
+    async def score(text):
+        text = normalize(text)
+        if cache is None:
+            return await predict(text)
+        return await cache.get_or_compute(content_key(text), lambda: predict(text))
+
+    pipeline = build_pipeline(word_filter, score, args.threshold)
+    latencies = []
+    actions = {"delete": 0, "flag": 0, "allow": 0, "none": 0}
+
+    async def scan(message):
+        started = time.perf_counter()
+        verdict = await pipeline.scan(message)
+        latencies.append(time.perf_counter() - started)
+        actions[verdict.action if verdict is not None else "none"] += 1
+
+    started = time.perf_counter()
+    if batched:
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def limited(message):
+            async with semaphore:
+                await scan(message)
+
+        await asyncio.gather(*(limited(message) for message in messages))
+    else:
+        for message in messages:
+            await scan(message)
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    result = {
+        "mode": "batched" if batched else "unbatched",
+        "messages": len(messages),
+        "seconds": elapsed,
+        "messages_per_second": len(messages) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "peak_rss_mb": peak_rss() / 1e6,
+        "flag_rate": actions["flag"] / len(messages) if messages else 0.0,
+        "delete_rate": actions["delete"] / len(messages) if messages else 0.0,
+        "actions": actions,
+        "rules": [
+            {"rule": name, "checked": checked, "hits": hits, "mean_us": mean_us}
+            for name, checked, hits, mean_us in pipeline.stats()
+        ],
+    }
+    if inference is not None:
+        result["mean_batch"] = inference.snapshot()["mean_batch"]
+        await inference.close()
+    if cache is not None:
+        result["cache_hit_rate"] = cache.snapshot()["hit_rate"]
+    return result
+
+def print_result(result):
+    print(f"\n{result['mode']}: {result['messages']} messages in {result['seconds']:.2f}s")
+    print(f"  throughput  {result['messages_per_second']:.0f} msg/s")
+    print(f"  latency     p50 {result['p50_ms']:.3f} ms, p95 {result['p95_ms']:.3f} ms, p99 {result['p99_ms']:.3f} ms")
+    print(f"  peak RSS    {result['peak_rss_mb']:.1f} MB")
+    print(
+        f"  verdicts    flagged {result['flag_rate']:.2%}, deleted {result['delete_rate']:.2%}, "
+        f"allowed {result['actions']['allow']}, passed {result['actions']['none']}"
+    )
+    if "mean_batch" in result:
+        print(f"  mean batch  {result['mean_batch']:.1f}")
+    if "cache_hit_rate" in result:
+        print(f"  cache hits  {result['cache_hit_rate']:.1%}")
+    for rule in result["rules"]:
+        print(f"  {rule['rule']:<12}checked {rule['checked']}, hits {rule['hits']}, mean {rule['mean_us']:.1f} µs")
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a message corpus through the moderation pipeline.")
+    parser.add_argument("corpus", help="JSONL file of messages")
+    parser.add_argument("--mode", choices=["unbatched", "batched", "both"], default="both")
+    parser.add_argument("--model", default=MODEL_DIR, help="model directory (pickles, compact copy or online checkpoint)")
+    parser.add_argument("--words", default=REMOVE_WORDS_PATH, help="remove list, one term per line")
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--batch-size", type=int, default=INFERENCE_BATCH)
+    parser.add_argument("--batch-delay", type=float, default=INFERENCE_DELAY)
+    parser.add_argument("--concurrency", type=int, default=256, help="messages in flight in batched mode")
+    parser.add_argument("--cache", action="store_true", help="put the score cache in front of the model, as the cog does")
+    parser.add_argument("--limit", type=int, default=None, help="replay only the first N messages")
+    parser.add_argument("--json", action="store_true", help="print results as JSON lines")
+    args = parser.parse_args()
+
+    messages = load_corpus(args.corpus, args.limit)
+    word_list = WordList(args.words)
+    word_list.reload_if_changed()
+    rss_before = current_rss()
+    model = load_model_dir(args.model)
+    if not args.json:
+        print(
+            f"{len(messages)} messages, {len(word_list.filter)} filtered terms, model {model.version} ({model.kind}) "
+            f"loaded in {model.load_seconds:.2f}s, ~{(current_rss() - rss_before) / 1e6:.1f} MB"
+        )
+
+    modes = [False, True] if args.mode == "both" else [args.mode == "batched"]
+    for batched in modes:
+        result = asyncio.run(replay(messages, model, word_list.filter, args, batched))
+        result["model"] = model.version
+        if args.json:
+            print(json.dumps(result))
+        else:
+            print_result(result)
+
+if __name__ == "__main__":
+    main()
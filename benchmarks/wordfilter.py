@@ -0,0 +1,95 @@
+import argparse, random, re, string, time
+from helpers.wordfilter import WordFilter
+
+# Micro-benchmark: the compiled WordFilter against the regex alternation the
+# moderation cog used before it, r'\b(term|...)\b' with re.IGNORECASE.
+#
+#   python -m benchmarks.wordfilter [--sizes 10 1000 50000] [--messages 2000]
+#
+# Terms and messages are generated from a fixed seed. Messages are chat-sized and
+# about one in five contains a term. For each list size it reports the build time
+# and the mean time per message of both, and checks they remove the same text.
+
+VOCABULARY_SIZE = 5000
+
+def random_word(rng):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9)))
+
+def make_terms(rng, count):
+    terms = set()
+    while len(terms) < count:
+        if rng.random() < 0.2:
+            terms.add(f"{random_word(rng)} {random_word(rng)}")  # some multi-word phrases
+        else:
+            terms.add(random_word(rng))
+    return sorted(terms)
+
+def make_messages(rng, terms, vocabulary, count):
+    messages = []
+    for _ in range(count):
+        words = [rng.choice(vocabulary) for _ in range(rng.randint(3, 25))]
+        if rng.random() < 0.2:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(terms).upper() if rng.random() < 0.3 else rng.choice(terms))
+        text = " ".join(words)
+        if rng.random() < 0.3:
+            text += rng.choice("!?.")
+        messages.append(text)
+    return messages
+
+def regex_filter(terms):
+    """The previous implementation."""
+    return re.compile(r'\b(' + '|'.join(map(re.escape, terms)) + r')\b', flags=re.IGNORECASE)
+
+def time_per_message(sub, messages):
+    started = time.perf_counter()
+    for message in messages:
+        sub(message)
+    return (time.perf_counter() - started) / len(messages)
+
+def bench(size, message_count, seed):
+    rng = random.Random(seed)
+    terms = make_terms(rng, size)
+    vocabulary = [random_word(rng) for _ in range(VOCABULARY_SIZE)]
+    messages = make_messages(rng, terms, vocabulary, message_count)
+
+    started = time.perf_counter()
+    pattern = regex_filter(terms)
+    regex_build = time.perf_counter() - started
+    started = time.perf_counter()
+    word_filter = WordFilter(terms)
+    filter_build = time.perf_counter() - started
+
+    # The alternation tries terms in list order, so where terms overlap it can stop
+    # at a shorter one; the filter takes the longest. Compare with the terms
+    # longest first, which makes the regex pick the same match.
+    reference = regex_filter(sorted(terms, key=len, reverse=True))
+    mismatches = sum(reference.sub('', m) != word_filter.sub('', m) for m in messages)
+
+    regex_time = time_per_message(lambda m: pattern.sub('', m), messages)
+    filter_time = time_per_message(lambda m: word_filter.sub('', m), messages)
+    return {
+        "size": size,
+        "regex_build": regex_build,
+        "filter_build": filter_build,
+        "regex_us": regex_time * 1e6,
+        "filter_us": filter_time * 1e6,
+        "mismatches": mismatches,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare WordFilter with a regex alternation.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 50000], help="term list sizes")
+    parser.add_argument("--messages", type=int, default=2000, help="messages per size")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'terms':>7} | {'regex build':>11} | {'filter build':>12} | {'regex/msg':>10} | {'filter/msg':>10} | {'speedup':>7} | mismatches")
+    for size in args.sizes:
+        r = bench(size, args.messages, args.seed)
+        print(
+            f"{r['size']:>7} | {r['regex_build'] * 1000:>9.1f}ms | {r['filter_build'] * 1000:>10.1f}ms | "
+            f"{r['regex_us']:>8.1f}µs | {r['filter_us']:>8.1f}µs | {r['regex_us'] / r['filter_us']:>6.1f}x | {r['mismatches']}"
+        )
+
+if __name__ == "__main__":
+    main()
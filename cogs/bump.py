@@ -1,6 +1,7 @@
 import discord, json, asyncio, yaml
-from discord.ext import commands, tasks
-from datetime import datetime
+from discord.ext import commands
+from datetime import datetime, timedelta
+from helpers.scheduler import get_scheduler
 
 # Load config.yml
 with open('config.yml', 'r') as f:
@@ -8,61 +9,56 @@ with open('config.yml', 'r') as f:
 class BumpCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.bump_check.start()  # Start the background task after initialization
+        self.scheduler = get_scheduler(bot)
+        self.scheduler.register("bump.reminder", self.send_bump_reminder)
+        self.import_last_bump()
     
     
     CHANNELID = config['channels']['commands']
     SERVERID = config['server']['id']
+    BUMP_COOLDOWN = 7200  # seconds until the server can be bumped again
+
+    def import_last_bump(self):
+        """
+        Carry over a pending reminder from data/bumptime.json, which tracked the
+        last bump before the scheduler did.
+        """
+        if self.scheduler.get("bump:reminder"):
+            return
+        try:
+            with open(r'data/bumptime.json', 'r') as f:
+                data = json.load(f).get("lastbump", str(0))
+            if data != str(0):
+                last_bumped = datetime.strptime(data, '%Y-%m-%d %H:%M:%S.%f')
+                due = last_bumped + timedelta(seconds=self.BUMP_COOLDOWN)
+                self.scheduler.schedule("bump:reminder", (due - datetime(1970, 1, 1)).total_seconds(), "bump.reminder")
+                with open(r'data/bumptime.json', 'w') as f:
+                    json.dump({"lastbump": str(0)}, f, indent=4)
+        except Exception as e:
+            print(f"Failed to import bump time: {e}")
 
     @commands.Cog.listener()
     async def on_message(self, message):
         if message.author.id == 302050872383242240:  # Bump bot ID
             if message.embeds and ':thumbsup:' in message.embeds[0].description:
                 try:
-                    with open(r'data/bumptime.json', 'r') as file:
-                        timedata = json.load(file)
-                    timedata["lastbump"] = str(datetime.utcnow())
-                    with open(r'data/bumptime.json', 'w') as file:
-                        json.dump(timedata, file, indent=4)
+                    due = message.created_at + timedelta(seconds=self.BUMP_COOLDOWN)
+                    self.scheduler.schedule("bump:reminder", due, "bump.reminder")
                 except Exception as e:
                     print(f"Failed to update bump time: {e}")
 
-    @tasks.loop(minutes=1)
-    async def bump_check(self):
-        await self.bot.wait_until_ready()
-        try:
-            with open(r'data/bumptime.json', 'r') as f:
-                cache = json.load(f)
-            data = cache.get("lastbump", str(0))
-            if data != str(0):
-                last_bumped = datetime.strptime(data, '%Y-%m-%d %H:%M:%S.%f')
-                now = datetime.utcnow()
-                diff = now - last_bumped
-                time_data = int(diff.total_seconds())
-                if time_data > 7200:
-                    cache["lastbump"] = str(0)
-                    with open(r'data/bumptime.json', 'w') as f:
-                        json.dump(cache, f, indent=4)
-                    channel = self.bot.get_channel(self.CHANNELID)
-                    if channel:
-                        embed = discord.Embed(
-                            title="This Server can be bumped again!",
-                            description=f"Type `/bump` to bump at https://disboard.org/server/{self.SERVERID}",
-                            color=discord.Color.blurple()
-                        )
-                        role = config['roles']['bump_ping']
-                        await channel.send(content=f"<@&{role}>", embed=embed)
-                    else:
-                        print("Bump channel not found. Check CHANNELID.")
-        except Exception as e:
-            print(f"Error in bump_check: {e}")
-
-    @bump_check.before_loop
-    async def before_bump_check(self):
-        await self.bot.wait_until_ready()
-
-    def cog_unload(self):
-        self.bump_check.cancel()
+    async def send_bump_reminder(self, name, payload):
+        channel = self.bot.get_channel(self.CHANNELID)
+        if channel:
+            embed = discord.Embed(
+                title="This Server can be bumped again!",
+                description=f"Type `/bump` to bump at https://disboard.org/server/{self.SERVERID}",
+                color=discord.Color.blurple()
+            )
+            role = config['roles']['bump_ping']
+            await channel.send(content=f"<@&{role}>", embed=embed)
+        else:
+            print("Bump channel not found. Check CHANNELID.")
 
 
 async def setup(bot):
@@ -1,69 +1,994 @@
-import discord, math, random, asyncio
-import aiosqlite
-from discord.ext import commands
+import discord, math, random, asyncio, time, re, json
+from bisect import bisect_right
+from collections import OrderedDict
+from datetime import datetime, timezone
+from discord.ext import commands, tasks
 from discord.ext.commands import CooldownMapping
+from helpers import database
+from helpers.checks import is_owner
+from helpers.scheduler import get_scheduler
+from helpers.ranking import RankIndex
 
-class LevelSystem(commands.Cog):
-    def __init__(self, bot):
-        self.bot = bot
-        self.db = None
-        self.cooldowns = CooldownMapping.from_cooldown(1, 5, commands.BucketType.user)
-        self.prize_interval = 10
-
-    async def init_db(self):
-        self.db = await aiosqlite.connect("data/levels.db")
-        await self._create_tables()
+XP_PER_MESSAGE = 8
+XP_COOLDOWN = 5  # seconds before a user's next message earns XP again
+CACHE_SIZE = 50000  # most users kept in the XP cache (roughly 200 bytes each)
+FLUSH_INTERVAL = 5  # seconds between XP cache flushes
+LEADERBOARD_PAGE_SIZE = 10
+LEADERBOARD_TTL = 300  # seconds a rendered leaderboard page is reused (covers name changes)
+PRIZE_AUDIT_PAGE_SIZE = 10
+LEVEL_ROLE_INTERVAL = 5  # a "Level N" role is given every this many levels
+LEVELUP_BATCH = 100  # most queued level-ups handled in one pass of the worker
+MESSAGE_LIMIT = 2000  # Discord's message length limit
+BACKFILL_CONCURRENCY = 4  # channels read at once; discord.py queues requests past the rate limits
+BACKFILL_CHUNK = 1000  # messages read between checkpoints
+BACKFILL_WRITE_BATCH = 5000  # users per transaction when writing the rebuilt totals
+PRESENCE_CHUNK = 5000  # users whose present flag is updated per write job
+ROLE_SYNC_WORKERS = 3  # members whose roles are edited at once
+ROLE_SYNC_CHUNK = 100  # members handled between checkpoints
+PROGRESS_INTERVAL = 5  # seconds between progress updates of owner/admin jobs
+SEASON_MONTHS = 1  # season length: 1 for monthly seasons, 3 for quarterly
+DISCORD_EPOCH_MS = 1420070400000
 
-    async def _create_tables(self):
-        """Create the tables if they don't exist."""
-        await self.db.execute("""
+# Schema migrations for data/levels.db, applied in order by helpers.database.
+MIGRATIONS = [
+    (
+        """
         CREATE TABLE IF NOT EXISTS levels (
             user_id INTEGER PRIMARY KEY,
             level INTEGER NOT NULL,
             xp INTEGER NOT NULL
         )
-        """)
-        await self.db.execute("""
+        """,
+        """
         CREATE TABLE IF NOT EXISTS prize_claims (
             user_id INTEGER NOT NULL,
             level INTEGER NOT NULL,
             claimed INTEGER NOT NULL,
             PRIMARY KEY (user_id, level)
         )
-        """)
-        await self.db.commit()
+        """,
+    ),
+    # Cumulative XP, so level/progress can be derived from one number and ranking
+    # can use a single index. total_xp = (XP needed to reach `level`) + xp, where
+    # sum(5i^2 + 50i + 100 for i < L) = 5(L-1)L(2L-1)/6 + 25(L-1)L + 100L.
+    (
+        "ALTER TABLE levels ADD COLUMN total_xp INTEGER NOT NULL DEFAULT 0",
+        """
+        UPDATE levels SET total_xp =
+            5 * ((level - 1) * level * (2 * level - 1) / 6) + 25 * (level - 1) * level + 100 * level + xp
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_levels_total_xp ON levels(total_xp)",
+    ),
+    # Whether the user is still in a guild with the bot, so rankings can skip departed users.
+    (
+        "ALTER TABLE levels ADD COLUMN present INTEGER NOT NULL DEFAULT 1",
+        "CREATE INDEX IF NOT EXISTS idx_levels_present_total_xp ON levels(present, total_xp)",
+    ),
+    # Checkpoints for /xp_backfill: how far each channel has been read, and the
+    # (author, message) pairs seen so far, so a restart resumes where it stopped.
+    (
+        """
+        CREATE TABLE IF NOT EXISTS backfill_channels (
+            channel_id INTEGER PRIMARY KEY,
+            last_message_id INTEGER,
+            messages INTEGER NOT NULL DEFAULT 0,
+            done INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS backfill_messages (
+            user_id INTEGER NOT NULL,
+            message_id INTEGER NOT NULL,
+            PRIMARY KEY (user_id, message_id)
+        ) WITHOUT ROWID
+        """,
+    ),
+    # Checkpoint for /sync_level_roles: members are handled in id order, and every
+    # member up to last_member_id has been done.
+    (
+        """
+        CREATE TABLE IF NOT EXISTS role_sync (
+            guild_id INTEGER PRIMARY KEY,
+            last_member_id INTEGER NOT NULL
+        )
+        """,
+    ),
+    # Seasons. The running season's XP lives in the small season_xp table; at rollover
+    # it is renamed to season_archive_<id> (a schema-only change, however big it is) and
+    # kept read-only, and a fresh season_xp takes its place. levels keeps the all-time totals.
+    (
+        """
+        CREATE TABLE IF NOT EXISTS seasons (
+            id INTEGER PRIMARY KEY,
+            started_at INTEGER NOT NULL,
+            ended_at INTEGER,
+            archive_table TEXT
+        )
+        """,
+        "INSERT INTO seasons (id, started_at) VALUES (1, CAST(strftime('%s', 'now') AS INTEGER))",
+        "CREATE TABLE IF NOT EXISTS season_xp (user_id INTEGER PRIMARY KEY, xp INTEGER NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS idx_season_1_xp ON season_xp(xp)",
+    ),
+]
 
-    async def get_user_data(self, user_id):
-        """Fetch user data from the database."""
-        async with self.db.execute("SELECT level, xp FROM levels WHERE user_id = ?", (user_id,)) as cursor:
-            result = await cursor.fetchone()
+# Prize levels (multiples of :interval up to :level) that :user_id hasn't claimed.
+PRIZE_LEVELS = """
+WITH RECURSIVE prize_levels(level) AS (
+    SELECT :interval WHERE :interval <= :level
+    UNION ALL
+    SELECT level + :interval FROM prize_levels WHERE level + :interval <= :level
+)
+"""
+UNCLAIMED_PRIZES = """
+FROM prize_levels
+WHERE NOT EXISTS (
+    SELECT 1 FROM prize_claims p WHERE p.user_id = :user_id AND p.level = prize_levels.level AND p.claimed = 1
+)
+"""
+
+# One page of present users with unclaimed prizes, walked down idx_levels_present_total_xp
+# from the (total_xp, user_id) cursor. Grouping in index order lets SQLite stop at :limit.
+PRIZE_AUDIT = """
+SELECT l.user_id, l.level, l.total_xp, group_concat(p.level)
+FROM levels l
+LEFT JOIN prize_claims p
+    ON p.user_id = l.user_id AND p.level <= l.level AND p.level % :interval = 0 AND p.claimed = 1
+WHERE l.present = 1 AND l.total_xp >= :min_xp AND (l.total_xp, l.user_id) < (:after_xp, :after_id)
+GROUP BY l.total_xp, l.user_id
+HAVING COUNT(p.level) < l.level / :interval
+ORDER BY l.total_xp DESC, l.user_id DESC
+LIMIT :limit
+"""
+
+LEVEL_ROLE_PATTERN = re.compile(r"Level (\d+)")
+
+def is_level_role(role):
+    """Whether `role` is one of the "Level N" roles the level system hands out."""
+    match = LEVEL_ROLE_PATTERN.fullmatch(role.name)
+    return match is not None and int(match[1]) > 0 and int(match[1]) % LEVEL_ROLE_INTERVAL == 0
+
+def level_role_names(level):
+    """Names of every level role a user at `level` should have."""
+    return [f"Level {n}" for n in range(LEVEL_ROLE_INTERVAL, level + 1, LEVEL_ROLE_INTERVAL)]
+
+def season_start(moment):
+    """Start (UTC) of the season `moment` falls in."""
+    month = (moment.month - 1) // SEASON_MONTHS * SEASON_MONTHS + 1
+    return datetime(moment.year, month, 1, tzinfo=timezone.utc)
+
+def next_season_start(moment):
+    """Start (UTC) of the season after the one `moment` falls in."""
+    start = season_start(moment)
+    month = start.month + SEASON_MONTHS
+    return datetime(start.year + (month - 1) // 12, (month - 1) % 12 + 1, 1, tzinfo=timezone.utc)
+
+def season_name(season_id, started_at):
+    start = season_start(datetime.fromtimestamp(started_at, timezone.utc))
+    if SEASON_MONTHS == 3:
+        return f"Season {season_id} ({start.year} Q{(start.month - 1) // 3 + 1})"
+    return f"Season {season_id} ({start:%B %Y})"
+
+# LEVEL_THRESHOLDS[L] is the total XP needed to reach level L; extended on demand.
+LEVEL_THRESHOLDS = [0]
+
+def xp_required(level):
+    """XP needed to go from `level` to the next one."""
+    return 5 * (level ** 2) + 50 * level + 100
+
+def total_xp_for(level, xp=0):
+    """Total XP of a user at `level` with `xp` into that level."""
+    while len(LEVEL_THRESHOLDS) <= level:
+        LEVEL_THRESHOLDS.append(LEVEL_THRESHOLDS[-1] + xp_required(len(LEVEL_THRESHOLDS) - 1))
+    return LEVEL_THRESHOLDS[level] + xp
+
+def level_for_total_xp(total_xp):
+    """Split total XP into (level, xp into that level) with a binary search of the thresholds."""
+    while LEVEL_THRESHOLDS[-1] <= total_xp:
+        total_xp_for(len(LEVEL_THRESHOLDS) * 2)
+    level = bisect_right(LEVEL_THRESHOLDS, total_xp) - 1
+    return level, total_xp - LEVEL_THRESHOLDS[level]
+
+class LevelSystem(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.db = None
+        self.cooldowns = CooldownMapping.from_cooldown(1, XP_COOLDOWN, commands.BucketType.user)
+        self.prize_interval = 10
+        self.scheduler = get_scheduler(bot)
+
+        # Write-back cache of total XP per user, least recently used first.
+        # Users in `dirty` have changes that flush() hasn't written yet, and users in `flushing`
+        # have a write in flight; neither is evicted, so a reload can't read a stale row.
+        self.cache = OrderedDict()
+        self.dirty = set()
+        self.flushing = set()
+        # XP earned this season that flush() hasn't added to season_xp yet.
+        self.season_gains = {}
+        # (guild_id, page) -> (embed, lowest total XP on the page, rendered at, cursor where the page ends)
+        self.leaderboard_cache = {}
+
+        # Total XP of every present user, for /rank. Built on ready and kept in step with the cache.
+        self.rank_index = None
+        # Cached users who aren't in rank_index: user_id -> True if they have no row yet
+        # (they join the ranking with their first XP), False if their row is not present.
+        self.unranked = {}
+        # While rank_index is being built: user_id -> total XP to index (None = remove).
+        self.rank_touched = None
+
+        # Level-ups waiting for their announcements and roles: (channel, member, old_level, level).
+        self.levelups = asyncio.Queue()
+        self.levelup_task = None
+        # guild_id -> {role name: role}, kept current by the guild role events.
+        self.role_index = {}
+        self.role_locks = {}
+
+        self.backfill_task = None
+        self.backfill_progress = None
+        self.role_sync_tasks = {}  # guild_id -> task
+        self.role_sync_progress = {}  # guild_id -> progress counters
+
+    async def init_db(self):
+        self.db = await database.connect("data/levels.db", "levels", MIGRATIONS)
+        self.flush_loop.start()
+
+    async def cog_unload(self):
+        self.flush_loop.cancel()
+        if self.levelup_task is not None:
+            self.levelup_task.cancel()
+            self.levelup_task = None
+        if self.backfill_task is not None:
+            self.backfill_task.cancel()
+            self.backfill_task = None
+        for task in self.role_sync_tasks.values():
+            task.cancel()
+        self.role_sync_tasks = {}
+        if self.db is not None:
+            await self.flush()
+            await database.release(self.db)
+            self.db = None
+
+    async def get_total_xp(self, user_id):
+        """Fetch a user's total XP from the cache, loading it from the database on a miss."""
+        total_xp = self.cache.get(user_id)
+        if total_xp is not None:
+            self.cache.move_to_end(user_id)
+            return total_xp
+        result = await self.db.fetchone("SELECT total_xp, present FROM levels WHERE user_id = ?", (user_id,))
+        # Another task may have loaded (and changed) this user while we were waiting.
+        if user_id in self.cache:
+            return self.cache[user_id]
+        return self.cache_loaded(user_id, result)
+
+    def cache_loaded(self, user_id, result):
+        """Cache a user's (total_xp, present) row, or None if they have none. Returns their total XP."""
+        total_xp = result[0] if result is not None else 0
+        self.cache[user_id] = total_xp
         if result is None:
-            await self.db.execute("INSERT INTO levels (user_id, level, xp) VALUES (?, ?, ?)", (user_id, 0, 0))
-            await self.db.commit()
-            return 0, 0
-        return result
+            self.unranked[user_id] = True
+        elif not result[1]:
+            self.unranked[user_id] = False
+        self.evict()
+        return total_xp
+
+    def set_total_xp(self, user_id, total_xp):
+        """Update a user's total XP in the cache; flush_loop writes it to the database."""
+        old = self.cache.get(user_id)
+        if user_id not in self.unranked:
+            self.move_rank(user_id, old, total_xp)
+        elif self.unranked[user_id]:
+            del self.unranked[user_id]
+            self.move_rank(user_id, None, total_xp)
+        self.cache[user_id] = total_xp
+        self.cache.move_to_end(user_id)
+        self.dirty.add(user_id)
+        self.evict()
+        self.invalidate_leaderboard(total_xp)
+
+    async def add_xp(self, user_id, amount):
+        """Grant XP. Returns (old_level, new_level, xp into the new level)."""
+        total_xp = await self.get_total_xp(user_id)
+        old_level, _ = level_for_total_xp(total_xp)
+        self.set_total_xp(user_id, total_xp + amount)
+        self.season_gains[user_id] = self.season_gains.get(user_id, 0) + amount
+        level, xp = level_for_total_xp(total_xp + amount)
+        return old_level, level, xp
+
+    async def get_user_data(self, user_id):
+        """Fetch a user's (level, xp into that level)."""
+        return level_for_total_xp(await self.get_total_xp(user_id))
 
     async def update_user_data(self, user_id, level, xp):
-        """Update user data in the database."""
-        await self.db.execute("UPDATE levels SET level = ?, xp = ? WHERE user_id = ?", (level, xp, user_id))
-        await self.db.commit()
+        """Set a user's level and XP into that level."""
+        await self.get_total_xp(user_id)
+        self.set_total_xp(user_id, total_xp_for(level, xp))
+
+    def evict(self):
+        """Drop the least recently used clean entries until the cache fits in CACHE_SIZE."""
+        excess = len(self.cache) - CACHE_SIZE
+        if excess <= 0:
+            return
+        victims = []
+        for user_id in self.cache:
+            if user_id not in self.dirty and user_id not in self.flushing:
+                victims.append(user_id)
+                if len(victims) == excess:
+                    break
+        for user_id in victims:
+            del self.cache[user_id]
+            self.unranked.pop(user_id, None)
+
+    async def flush(self):
+        """Write every dirty cache entry and the pending season XP to the database in one transaction."""
+        if not self.dirty or self.db is None:
+            return 0
+        dirty, self.dirty = self.dirty, set()
+        gains, self.season_gains = self.season_gains, {}
+        rows = [(user_id, *level_for_total_xp(self.cache[user_id]), self.cache[user_id]) for user_id in dirty]
+        # Kept from eviction until the write has committed (or failed and they're dirty again).
+        self.flushing |= dirty
+
+        async def run(conn):
+            await conn.executemany("""
+            INSERT INTO levels (user_id, level, xp, total_xp) VALUES (?, ?, ?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET level = excluded.level, xp = excluded.xp, total_xp = excluded.total_xp
+            """, rows)
+            await self.write_season_gains(conn, gains)
+
+        try:
+            await self.db.write(run)
+        except Exception as e:
+            self.dirty |= {user_id for user_id in dirty if user_id in self.cache}
+            for user_id, amount in gains.items():
+                self.season_gains[user_id] = self.season_gains.get(user_id, 0) + amount
+            print(f"Failed to flush XP cache: {e}")
+            return 0
+        finally:
+            self.flushing -= dirty
+        return len(rows)
+
+    async def write_season_gains(self, conn, gains):
+        await conn.executemany("""
+        INSERT INTO season_xp (user_id, xp) VALUES (?, ?)
+        ON CONFLICT(user_id) DO UPDATE SET xp = xp + excluded.xp
+        """, list(gains.items()))
+
+    @tasks.loop(seconds=FLUSH_INTERVAL)
+    async def flush_loop(self):
+        await self.flush()
+
+    def invalidate_leaderboard(self, total_xp=None):
+        """
+        Drop cached leaderboard pages that a user with `total_xp` would now appear on
+        (every page if None). XP only goes up, so a page can only change when someone
+        reaches its lowest entry; later pages have lower entries and go with it.
+        """
+        if total_xp is None:
+            self.leaderboard_cache.clear()
+            return
+        for key, (_, lowest, _, _) in list(self.leaderboard_cache.items()):
+            if total_xp >= lowest:
+                del self.leaderboard_cache[key]
+
+    def leaderboard_resume(self, guild_id, page):
+        """
+        (page, cursor) of the nearest earlier cached page of the guild, for top_members to
+        walk on from. Invalidation drops a page as soon as anyone could move above its end,
+        so its cursor still has exactly that page's members before it.
+        """
+        now = time.monotonic()
+        best = None
+        for (cached_guild, earlier), (_, _, rendered_at, cursor) in self.leaderboard_cache.items():
+            if cached_guild == guild_id and earlier < page and now - rendered_at < LEADERBOARD_TTL:
+                if best is None or earlier > best[0]:
+                    best = (earlier, cursor)
+        return best
+
+    def move_rank(self, user_id, old, new):
+        """Move a user's entry in rank_index from total XP `old` to `new` (None = not ranked)."""
+        if self.rank_touched is not None:
+            self.rank_touched[user_id] = new
+            return
+        if self.rank_index is None:
+            return
+        if old is not None:
+            self.rank_index.discard(old)
+        if new is not None:
+            self.rank_index.add(new)
+
+    async def rebuild_rank_index(self):
+        """
+        Load every present user's total XP into a fresh rank_index. The build runs in a
+        thread; changes made meanwhile are recorded in rank_touched and replayed on top.
+        """
+        self.rank_index = None
+        self.rank_touched = {}
+        await self.flush()
+        stored = dict(await self.db.fetchall("SELECT user_id, total_xp FROM levels WHERE present = 1"))
+        index = await asyncio.to_thread(RankIndex, stored.values())
+        for user_id, total_xp in self.rank_touched.items():
+            if user_id in stored:
+                index.discard(stored[user_id])
+            if total_xp is not None:
+                index.add(total_xp)
+        self.rank_index = index
+        self.rank_touched = None
+        print(f"Built rank index of {len(index)} users.")
+
+    async def set_present(self, user_ids, present):
+        if not user_ids:
+            return
+
+        changed = []
+        user_ids = list(user_ids)
+        # One UPDATE per chunk, so a big reconcile doesn't hold the writer for long.
+        for start in range(0, len(user_ids), PRESENCE_CHUNK):
+            chunk = json.dumps(user_ids[start:start + PRESENCE_CHUNK])
+
+            async def run(conn, chunk=chunk):
+                async with conn.execute("""
+                UPDATE levels SET present = ?
+                WHERE present != ? AND user_id IN (SELECT value FROM json_each(?))
+                RETURNING user_id, total_xp
+                """, (present, present, chunk)) as cursor:
+                    return await cursor.fetchall()
+
+            changed.extend(await self.db.write(run))
+
+        for user_id, stored_xp in changed:
+            if user_id not in self.cache:
+                # Not cached means not dirty, so the stored total is current.
+                if present:
+                    self.move_rank(user_id, None, stored_xp)
+                else:
+                    self.move_rank(user_id, stored_xp, None)
+            elif present and user_id in self.unranked:
+                del self.unranked[user_id]
+                self.move_rank(user_id, None, self.cache[user_id])
+            elif not present and user_id not in self.unranked:
+                self.unranked[user_id] = False
+                self.move_rank(user_id, self.cache[user_id], None)
+        self.invalidate_leaderboard()
+
+    async def reconcile_presence(self):
+        """Bring the present flag in line with who is actually in a guild with the bot."""
+        member_ids = {member.id for guild in self.bot.guilds for member in guild.members}
+        rows = await self.db.fetchall("SELECT user_id, present FROM levels")
+        joined = [user_id for user_id, present in rows if not present and user_id in member_ids]
+        left = [user_id for user_id, present in rows if present and user_id not in member_ids]
+        await self.set_present(joined, 1)
+        await self.set_present(left, 0)
+
+    async def ranked_members(self, guild, table, score, page, per_page, columns=(), where=None, resume=None):
+        """
+        Walk `table` in (score, user_id) order, highest first, with a keyset cursor and
+        return ([(member, score, *columns)], departed user ids, cursor) for one page of the
+        guild's members. Only rows for members of the guild count towards pages, so page N
+        starts after the (N - 1) * per_page members walked before it. `resume` is (page,
+        cursor) of an earlier page's end to walk on from instead of the top; the returned
+        cursor is where this page ends. `where` is an extra SQL condition on the rows.
+        """
+        done, cursor = resume or (0, None)
+        skip = (page - 1 - done) * per_page
+        select = f"SELECT {', '.join(('user_id', score) + tuple(columns))} FROM {table}"
+        order = f"ORDER BY {score} DESC, user_id DESC LIMIT ?"
+        found = []
+        departed = []
+        while len(found) < per_page:
+            limit = per_page * 2 + min(skip, 1000)
+            conditions = [where] if where else []
+            params = []
+            if cursor is not None:
+                conditions.append(f"({score}, user_id) < (?, ?)")
+                params.extend(cursor)
+            sql = select + (" WHERE " + " AND ".join(conditions) if conditions else "") + " " + order
+            rows = await self.db.fetchall(sql, (*params, limit))
+            if not rows:
+                break
+            for user_id, value, *rest in rows:
+                cursor = (value, user_id)
+                member = guild.get_member(user_id)
+                if member is None:
+                    departed.append(user_id)
+                    continue
+                if skip:
+                    skip -= 1
+                    continue
+                found.append((member, value, *rest))
+                if len(found) == per_page:
+                    break
+        return found, departed, cursor
+
+    async def top_members(self, guild, page=1, per_page=LEADERBOARD_PAGE_SIZE, resume=None):
+        """
+        Return ([(member, level, xp, total_xp)], cursor) for one page of the guild's ranking,
+        read off idx_levels_present_total_xp by ranked_members (see there for `resume` and
+        the cursor). Users the guild no longer has are skipped, and marked not present when
+        this is the bot's only guild.
+        """
+        await self.flush()
+        found, departed, cursor = await self.ranked_members(
+            guild, "levels", "total_xp", page, per_page, ("level", "xp"), "present = 1", resume
+        )
+        if departed and len(self.bot.guilds) == 1:
+            await self.set_present(departed, 0)
+        return [(member, level, xp, total_xp) for member, total_xp, level, xp in found], cursor
 
     def calculate_xp_required(self, level):
         """Calculate the XP required for the next level."""
-        return 5 * (level ** 2) + 50 * level + 100
+        return xp_required(level)
+
+    async def unclaimed_prizes(self, user_id, level):
+        """List the prize levels up to `level` that a user hasn't claimed."""
+        params = {"user_id": user_id, "level": level, "interval": self.prize_interval}
+        rows = await self.db.fetchall(PRIZE_LEVELS + "SELECT level" + UNCLAIMED_PRIZES + "ORDER BY level", params)
+        return [row[0] for row in rows]
+
+    async def claim_prizes(self, user_id, level):
+        """Mark every unclaimed prize up to `level` as claimed in one transaction. Returns the levels claimed."""
+        params = {"user_id": user_id, "level": level, "interval": self.prize_interval}
+
+        async def run(conn):
+            async with conn.execute(PRIZE_LEVELS + "SELECT level" + UNCLAIMED_PRIZES + "ORDER BY level", params) as cursor:
+                claimed = [row[0] for row in await cursor.fetchall()]
+            if claimed:
+                await conn.execute(
+                    PRIZE_LEVELS + "INSERT INTO prize_claims (user_id, level, claimed) SELECT :user_id, level, 1"
+                    + UNCLAIMED_PRIZES + "ON CONFLICT(user_id, level) DO UPDATE SET claimed = 1",
+                    params
+                )
+            return claimed
+
+        return await self.db.write(run)
+
+    async def prize_audit_page(self, after=None, limit=PRIZE_AUDIT_PAGE_SIZE):
+        """
+        Return [(user_id, level, total_xp, unclaimed levels)] for up to `limit` present users
+        with unclaimed prizes, highest XP first, starting after the (total_xp, user_id) cursor `after`.
+        """
+        await self.flush()
+        after_xp, after_id = after if after is not None else (1 << 62, 0)
+        rows = await self.db.fetchall(PRIZE_AUDIT, {
+            "interval": self.prize_interval,
+            "min_xp": total_xp_for(self.prize_interval),
+            "after_xp": after_xp,
+            "after_id": after_id,
+            "limit": limit,
+        })
+        page = []
+        for user_id, level, total_xp, claimed in rows:
+            claimed = {int(lvl) for lvl in claimed.split(",")} if claimed else set()
+            unclaimed = [lvl for lvl in range(self.prize_interval, level + 1, self.prize_interval) if lvl not in claimed]
+            page.append((user_id, level, total_xp, unclaimed))
+        return page
+
+    def roles_by_name(self, guild):
+        """The guild's name -> role index, built on first use."""
+        roles = self.role_index.get(guild.id)
+        if roles is None:
+            roles = {}
+            # Like discord.utils.get, the lowest role wins when names collide.
+            for role in reversed(guild.roles):
+                roles[role.name] = role
+            self.role_index[guild.id] = roles
+        return roles
+
+    async def ensure_level_roles(self, guild, names):
+        """
+        Return {name: role} for `names`, creating any the guild is missing. Creation
+        happens under a per-guild lock so concurrent level-ups can't create duplicates.
+        """
+        roles = self.roles_by_name(guild)
+        missing = [name for name in names if name not in roles]
+        if missing:
+            lock = self.role_locks.setdefault(guild.id, asyncio.Lock())
+            async with lock:
+                for name in missing:
+                    if name in roles:
+                        continue
+                    try:
+                        roles[name] = await guild.create_role(name=name)
+                    except discord.HTTPException as e:
+                        print(f"Failed to create role {name} in {guild.name}: {e}")
+        return {name: roles[name] for name in names if name in roles}
+
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role):
+        roles = self.role_index.get(role.guild.id)
+        if roles is not None:
+            roles.setdefault(role.name, role)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role):
+        roles = self.role_index.get(role.guild.id)
+        if roles is None or roles.get(role.name) != role:
+            return
+        del roles[role.name]
+        # Fall back to another role with the same name, if there is one.
+        for other in role.guild.roles:
+            if other.name == role.name and other.id != role.id:
+                roles[role.name] = other
+                break
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before, after):
+        if before.name != after.name:
+            await self.on_guild_role_delete(before)
+            await self.on_guild_role_create(after)
+        else:
+            roles = self.role_index.get(after.guild.id)
+            if roles is not None and roles.get(after.name) == before:
+                roles[after.name] = after
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        self.role_index.pop(guild.id, None)
+        self.role_locks.pop(guild.id, None)
+
+    async def levelup_worker(self):
+        """Announce level-ups and hand out level roles off the message path."""
+        while True:
+            batch = [await self.levelups.get()]
+            while not self.levelups.empty() and len(batch) < LEVELUP_BATCH:
+                batch.append(self.levelups.get_nowait())
+            try:
+                await self.handle_levelups(batch)
+            except Exception as e:
+                print(f"Failed to handle level-ups: {e}")
+
+    async def handle_levelups(self, batch):
+        """Send one merged announcement per channel and one role update per member."""
+        announcements = {}  # channel id -> (channel, [lines])
+        role_names = {}  # (guild id, member id) -> (member, {role names})
+        for channel, member, old_level, level in batch:
+            lines = announcements.setdefault(channel.id, (channel, []))[1]
+            lines.append(f"🎉 {member.mention}, you have leveled up to: Level {level}!")
+            for reached in range(old_level + 1, level + 1):
+                if reached % self.prize_interval == 0:
+                    lines.append(
+                        f"🎁 {member.mention}, you have reached Level {reached}! You are able to claim a prize now. **Open a ticket**!"
+                    )
+                if reached % LEVEL_ROLE_INTERVAL == 0 and getattr(member, "guild", None) is not None:
+                    role_names.setdefault((member.guild.id, member.id), (member, set()))[1].add(f"Level {reached}")
 
-    async def has_claimed_prize(self, user_id, level):
-        """Check if a user has claimed the prize for a given level."""
-        async with self.db.execute("SELECT claimed FROM prize_claims WHERE user_id = ? AND level = ?", (user_id, level)) as cursor:
-            result = await cursor.fetchone()
-        return result is not None and result[0] == 1
+        for channel, lines in announcements.values():
+            chunk = ""
+            for line in lines:
+                if chunk and len(chunk) + len(line) + 1 > MESSAGE_LIMIT:
+                    await self.send_announcement(channel, chunk)
+                    chunk = ""
+                chunk = f"{chunk}\n{line}" if chunk else line
+            if chunk:
+                await self.send_announcement(channel, chunk)
 
-    async def set_prize_claimed(self, user_id, level):
-        """Mark a prize as claimed for a given level."""
-        await self.db.execute("""
-        INSERT OR REPLACE INTO prize_claims (user_id, level, claimed) VALUES (?, ?, ?)
-        """, (user_id, level, 1))
-        await self.db.commit()
+        for member, names in role_names.values():
+            roles = await self.ensure_level_roles(member.guild, sorted(names))
+            new_roles = [role for role in roles.values() if role not in member.roles]
+            if not new_roles:
+                continue
+            try:
+                await member.add_roles(*new_roles)
+            except discord.HTTPException as e:
+                print(f"Failed to give {member} their level roles: {e}")
+
+    async def send_announcement(self, channel, content):
+        try:
+            await channel.send(content)
+        except discord.HTTPException as e:
+            print(f"Failed to send level-up announcement to {channel}: {e}")
+
+    def backfill_channels(self):
+        """Every text channel whose history the bot can read."""
+        channels = []
+        for guild in self.bot.guilds:
+            for channel in guild.text_channels:
+                permissions = channel.permissions_for(guild.me)
+                if permissions.read_messages and permissions.read_message_history:
+                    channels.append(channel)
+        return channels
+
+    async def backfill_channel(self, channel, last_message_id, semaphore):
+        """Read a channel's history oldest first from its checkpoint, saving progress every BACKFILL_CHUNK messages."""
+        async with semaphore:
+            after = discord.Object(id=last_message_id) if last_message_id else None
+            seen = []
+            scanned = 0
+
+            async def checkpoint(done=False):
+                rows, count = seen[:], scanned
+
+                async def run(conn):
+                    await conn.executemany(
+                        "INSERT OR IGNORE INTO backfill_messages (user_id, message_id) VALUES (?, ?)", rows
+                    )
+                    await conn.execute("""
+                    INSERT INTO backfill_channels (channel_id, last_message_id, messages, done) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(channel_id) DO UPDATE SET
+                        last_message_id = excluded.last_message_id,
+                        messages = messages + excluded.messages,
+                        done = excluded.done
+                    """, (channel.id, last_message_id, count, int(done)))
+
+                await self.db.write(run)
+                seen.clear()
+
+            try:
+                async for message in channel.history(limit=None, after=after, oldest_first=True):
+                    scanned += 1
+                    last_message_id = message.id
+                    if not message.author.bot:
+                        seen.append((message.author.id, message.id))
+                    self.backfill_progress["messages"] += 1
+                    if scanned % BACKFILL_CHUNK == 0:
+                        await checkpoint()
+                        scanned = 0
+            except discord.HTTPException as e:
+                # Leave the channel unfinished so the next run picks it up again.
+                print(f"Backfill stopped reading #{channel.name}: {e}")
+                await checkpoint()
+                return
+            await checkpoint(done=True)
+            self.backfill_progress["channels_done"] += 1
+
+    async def backfill_totals(self):
+        """
+        Replay the collected messages per user in time order under the XP cooldown.
+        Returns {user_id: total XP}. Rows come back in primary key order, a user at a time.
+        """
+        totals = {}
+        cooldown_ms = XP_COOLDOWN * 1000
+        after = (0, 0)
+        while True:
+            rows = await self.db.fetchall(
+                "SELECT user_id, message_id FROM backfill_messages WHERE (user_id, message_id) > (?, ?) "
+                "ORDER BY user_id, message_id LIMIT 50000",
+                after
+            )
+            if not rows:
+                break
+            for user_id, message_id in rows:
+                sent = (message_id >> 22) + DISCORD_EPOCH_MS
+                total, next_allowed = totals.get(user_id, (0, 0))
+                if sent >= next_allowed:
+                    totals[user_id] = (total + XP_PER_MESSAGE, sent + cooldown_ms)
+            after = rows[-1]
+            await asyncio.sleep(0)
+        return {user_id: total for user_id, (total, _) in totals.items()}
+
+    async def apply_backfill(self, totals):
+        """
+        Raise users' total XP to their backfilled totals through the cache (XP is never
+        lowered), flushing every BACKFILL_WRITE_BATCH users. Users who have no row and
+        are no longer in a guild with the bot are skipped.
+        """
+        member_ids = {member.id for guild in self.bot.guilds for member in guild.members}
+        items = list(totals.items())
+        for start in range(0, len(items), BACKFILL_WRITE_BATCH):
+            chunk = items[start:start + BACKFILL_WRITE_BATCH]
+            missing = [user_id for user_id, _ in chunk if user_id not in self.cache]
+            if missing:
+                placeholders = ",".join("?" * len(missing))
+                rows = await self.db.fetchall(
+                    f"SELECT user_id, total_xp, present FROM levels WHERE user_id IN ({placeholders})", missing
+                )
+                found = {row[0]: row[1:] for row in rows}
+                for user_id in missing:
+                    result = found.get(user_id)
+                    if user_id not in self.cache and (result is not None or user_id in member_ids):
+                        self.cache_loaded(user_id, result)
+            for user_id, total in chunk:
+                if user_id in self.cache and self.cache[user_id] < total:
+                    self.set_total_xp(user_id, total)
+            await self.flush()
+
+    async def run_backfill(self, status):
+        """Read every channel, then rebuild and write the totals, reporting progress on `status`."""
+        rows = await self.db.fetchall("SELECT channel_id, last_message_id, done FROM backfill_channels")
+        checkpoints = {channel_id: (last_message_id, done) for channel_id, last_message_id, done in rows}
+        channels = self.backfill_channels()
+        pending = [channel for channel in channels if not checkpoints.get(channel.id, (None, 0))[1]]
+        self.backfill_progress = {
+            "channels": len(channels),
+            "channels_done": len(channels) - len(pending),
+            "messages": 0,
+            "started": time.monotonic(),
+        }
+
+        reporter = asyncio.create_task(self.report_progress(status, self.backfill_status))
+        try:
+            semaphore = asyncio.Semaphore(BACKFILL_CONCURRENCY)
+            await asyncio.gather(*(
+                self.backfill_channel(channel, checkpoints.get(channel.id, (None, 0))[0], semaphore)
+                for channel in pending
+            ))
+        finally:
+            reporter.cancel()
+
+        progress = self.backfill_progress
+        if progress["channels_done"] < progress["channels"]:
+            await self.report(status, self.backfill_status() + "\nSome channels failed; run the command again to resume.")
+            return
+        await self.report(status, self.backfill_status() + "\nAll channels read, rebuilding totals...")
+        totals = await self.backfill_totals()
+        await self.apply_backfill(totals)
+        await self.db.execute("DELETE FROM backfill_messages")
+        await self.db.execute("DELETE FROM backfill_channels")
+        await self.report(status, self.backfill_status() + f"\nDone: rebuilt XP for {len(totals)} users.")
+
+    def backfill_status(self):
+        progress = self.backfill_progress
+        elapsed = time.monotonic() - progress["started"]
+        rate = progress["messages"] / elapsed if elapsed > 0 else 0
+        return (
+            f"Backfilling XP: {progress['channels_done']}/{progress['channels']} channels, "
+            f"{progress['messages']} messages read ({rate:.0f} msg/s)."
+        )
+
+    async def report(self, status, content):
+        """
+        Edit `status` to `content`. Slash command responses stop accepting edits once
+        their interaction token expires (15 minutes), so failures are only logged and
+        never stop the job being reported on.
+        """
+        try:
+            await status.edit(content=content)
+        except discord.HTTPException as e:
+            print(f"Failed to update status message: {e}")
+
+    async def report_progress(self, status, render):
+        """Edit `status` to show render() every PROGRESS_INTERVAL seconds until cancelled."""
+        while True:
+            await asyncio.sleep(PROGRESS_INTERVAL)
+            await self.report(status, render())
+
+    async def sync_member_roles(self, member, level, roles):
+        """
+        Give `member` exactly the level roles for `level` (`roles` maps names to roles),
+        leaving their other roles, and level roles the bot can't manage, alone, in one
+        member.edit. Returns True if anything changed.
+        """
+        top = member.guild.me.top_role
+        wanted = {roles[name] for name in level_role_names(level) if name in roles and roles[name] < top}
+        current = [role for role in member.roles if not role.is_default()]
+        keep = [role for role in current if role in wanted or not is_level_role(role) or role >= top]
+        add = wanted.difference(current)
+        if not add and len(keep) == len(current):
+            return False
+        await member.edit(roles=keep + sorted(add), reason="Level role sync")
+        return True
+
+    async def stored_levels(self, user_ids):
+        """Current level of each of `user_ids`, from the cache where possible."""
+        levels = {}
+        missing = []
+        for user_id in user_ids:
+            if user_id in self.cache:
+                levels[user_id] = level_for_total_xp(self.cache[user_id])[0]
+            else:
+                missing.append(user_id)
+        if missing:
+            placeholders = ",".join("?" * len(missing))
+            rows = await self.db.fetchall(f"SELECT user_id, total_xp FROM levels WHERE user_id IN ({placeholders})", missing)
+            found = dict(rows)
+            for user_id in missing:
+                # The cache wins if the user was loaded (and maybe changed) meanwhile.
+                total_xp = self.cache.get(user_id, found.get(user_id, 0))
+                levels[user_id] = level_for_total_xp(total_xp)[0]
+        return levels
+
+    async def run_role_sync(self, guild, status, restart=False):
+        """
+        Bring every member's level roles in line with their stored level, ROLE_SYNC_CHUNK
+        members at a time in id order, checkpointing after each chunk so a restart resumes.
+        """
+        row = await self.db.fetchone("SELECT last_member_id FROM role_sync WHERE guild_id = ?", (guild.id,))
+        after = 0 if restart or row is None else row[0]
+        everyone = [member for member in guild.members if not member.bot]
+        members = sorted((member for member in everyone if member.id > after), key=lambda member: member.id)
+        progress = {
+            "members": len(everyone),
+            "checked": len(everyone) - len(members),
+            "changed": 0,
+            "failed": 0,
+            "started": time.monotonic(),
+        }
+        self.role_sync_progress[guild.id] = progress
+
+        def render():
+            return self.role_sync_status(guild.id)
+
+        reporter = asyncio.create_task(self.report_progress(status, render))
+        try:
+            for start in range(0, len(members), ROLE_SYNC_CHUNK):
+                chunk = members[start:start + ROLE_SYNC_CHUNK]
+                levels = await self.stored_levels([member.id for member in chunk])
+                # Create any missing level role once, up front, rather than per member.
+                roles = await self.ensure_level_roles(guild, level_role_names(max(levels.values())))
+                queue = list(chunk)
+
+                async def worker():
+                    while queue:
+                        member = queue.pop()
+                        try:
+                            if await self.sync_member_roles(member, levels[member.id], roles):
+                                progress["changed"] += 1
+                        except discord.HTTPException as e:
+                            progress["failed"] += 1
+                            print(f"Failed to sync level roles for {member}: {e}")
+                        progress["checked"] += 1
+
+                # discord.py waits out rate limits itself, so the workers just keep the pipe full.
+                await asyncio.gather(*(worker() for _ in range(ROLE_SYNC_WORKERS)))
+                await self.db.execute("""
+                INSERT INTO role_sync (guild_id, last_member_id) VALUES (?, ?)
+                ON CONFLICT(guild_id) DO UPDATE SET last_member_id = excluded.last_member_id
+                """, (guild.id, chunk[-1].id))
+        finally:
+            reporter.cancel()
+        await self.db.execute("DELETE FROM role_sync WHERE guild_id = ?", (guild.id,))
+        await self.report(status, render() + "\nDone.")
+
+    def role_sync_status(self, guild_id):
+        progress = self.role_sync_progress[guild_id]
+        elapsed = time.monotonic() - progress["started"]
+        return (
+            f"Syncing level roles: {progress['checked']}/{progress['members']} members checked in {elapsed:.0f}s, "
+            f"{progress['changed']} changed, {progress['failed']} failed."
+        )
+
+    async def current_season(self):
+        """The running season's (id, started_at)."""
+        return await self.db.fetchone("SELECT id, started_at FROM seasons WHERE ended_at IS NULL")
+
+    async def end_season(self):
+        """
+        Close the running season and start the next one. The pending season XP is written
+        and season_xp renamed to its archive table in one short transaction, so message
+        handling never waits on copying rows. Returns (ended id, archive table, new id).
+        """
+        gains, self.season_gains = self.season_gains, {}
+        now = int(time.time())
+
+        async def run(conn):
+            await self.write_season_gains(conn, gains)
+            async with conn.execute("SELECT id FROM seasons WHERE ended_at IS NULL") as cursor:
+                season_id = (await cursor.fetchone())[0]
+            archive = f"season_archive_{season_id}"
+            await conn.execute(f"ALTER TABLE season_xp RENAME TO {archive}")
+            await conn.execute(
+                "UPDATE seasons SET ended_at = ?, archive_table = ? WHERE id = ?", (now, archive, season_id)
+            )
+            cursor = await conn.execute("INSERT INTO seasons (started_at) VALUES (?)", (now,))
+            new_id = cursor.lastrowid
+            await conn.execute("CREATE TABLE season_xp (user_id INTEGER PRIMARY KEY, xp INTEGER NOT NULL)")
+            await conn.execute(f"CREATE INDEX idx_season_{new_id}_xp ON season_xp(xp)")
+            return season_id, archive, new_id
+
+        try:
+            ended, archive, new_id = await self.db.write(run)
+        except Exception:
+            for user_id, amount in gains.items():
+                self.season_gains[user_id] = self.season_gains.get(user_id, 0) + amount
+            raise
+        print(f"Season {ended} archived to {archive}; season {new_id} started.")
+        return ended, archive, new_id
+
+    def schedule_season_end(self):
+        """Schedule the running season to end at the start of the next season period (UTC)."""
+        ends = next_season_start(datetime.now(timezone.utc))
+        self.scheduler.schedule("levels:season", ends, "levels.season")
+        print(f"Current season ends at {ends} UTC.")
+
+    async def run_scheduled_season_end(self, name, payload):
+        try:
+            await self.end_season()
+        finally:
+            self.schedule_season_end()
+
+    async def top_season_members(self, guild, table, page=1, per_page=LEADERBOARD_PAGE_SIZE):
+        """Return [(member, season xp)] for one page of a season table's ranking, walked by ranked_members."""
+        await self.flush()
+        found, _, _ = await self.ranked_members(guild, table, "xp", page, per_page)
+        return found
 
     @commands.Cog.listener()
     async def on_ready(self):
@@ -74,6 +999,24 @@ class LevelSystem(commands.Cog):
             os.makedirs("data")
         if self.db is None:
             await self.init_db()
+        if self.levelup_task is None:
+            self.levelup_task = asyncio.create_task(self.levelup_worker())
+        self.scheduler.register("levels.season", self.run_scheduled_season_end)
+        if self.scheduler.get("levels:season") is None:
+            self.schedule_season_end()
+        await self.reconcile_presence()
+        if self.rank_index is None and self.rank_touched is None:
+            await self.rebuild_rank_index()
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member):
+        if self.db is not None:
+            await self.set_present([member.id], 1)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member):
+        if self.db is not None and not any(guild.get_member(member.id) for guild in self.bot.guilds):
+            await self.set_present([member.id], 0)
 
     @commands.Cog.listener()
     async def on_message(self, message):
@@ -87,33 +1030,11 @@ class LevelSystem(commands.Cog):
             return
 
         user_id = message.author.id
-        level, xp = await self.get_user_data(user_id)
-        xp += 8  # XP for sending a message
-        xp_required = self.calculate_xp_required(level)
+        old_level, level, xp = await self.add_xp(user_id, XP_PER_MESSAGE)
 
-        if xp >= xp_required:
-            level += 1
-            xp -= xp_required
-
-            # Notify level up
-            await message.channel.send(f"🎉 {message.author.mention}, you have leveled up to: Level {level}!")
-
-            # Notify prize redemption if applicable
-            if level % self.prize_interval == 0:
-                await message.channel.send(
-                    f"🎁 {message.author.mention}, you have reached Level {level}! You are able to claim a prize now. **Open a ticket**!"
-                )
-
-            # Assign a role 
-            if level % 5 == 0:
-                role_name = f"Level {level}"
-                guild = message.guild
-                role = discord.utils.get(guild.roles, name=role_name)
-                if role is None:
-                    role = await guild.create_role(name=role_name)
-                await message.author.add_roles(role)
-
-        await self.update_user_data(user_id, level, xp)
+        # The XP is already recorded; announcements and roles are left to levelup_worker.
+        if level > old_level:
+            self.levelups.put_nowait((message.channel, message.author, old_level, level))
 
     @commands.hybrid_command(name="prize")
     @commands.has_permissions(administrator=True)
@@ -126,11 +1047,7 @@ class LevelSystem(commands.Cog):
         user_level, _ = await self.get_user_data(user_id)
 
         if option.lower() == "check":
-            unclaimed = []
-            for lvl in range(self.prize_interval, user_level + 1, self.prize_interval):
-                if not await self.has_claimed_prize(user_id, lvl):
-                    unclaimed.append(lvl)
-
+            unclaimed = await self.unclaimed_prizes(user_id, user_level)
             if unclaimed:
                 levels = ", ".join(map(str, unclaimed))
                 await ctx.send(f"{member.mention} has not claimed prizes for levels: {levels}.")
@@ -138,12 +1055,7 @@ class LevelSystem(commands.Cog):
                 await ctx.send(f"{member.mention} has claimed all eligible prizes.")
 
         elif option.lower() == "claim":
-            claimed = []
-            for lvl in range(self.prize_interval, user_level + 1, self.prize_interval):
-                if not await self.has_claimed_prize(user_id, lvl):
-                    await self.set_prize_claimed(user_id, lvl)
-                    claimed.append(lvl)
-
+            claimed = await self.claim_prizes(user_id, user_level)
             if claimed:
                 levels = ", ".join(map(str, claimed))
                 await ctx.send(f"{member.mention} has now claimed prizes for levels: {levels}.")
@@ -152,6 +1064,103 @@ class LevelSystem(commands.Cog):
         else:
             await ctx.send("Invalid option. Use `check` or `claim`.")
 
+    @commands.hybrid_command(name="prizes")
+    @commands.has_permissions(administrator=True)
+    async def prizes(self, ctx):
+        """List every member with unclaimed prizes, highest level first."""
+        view = PrizeAuditView(self, ctx.author)
+        embed = await view.render()
+        if embed is None:
+            await ctx.send("Nobody has unclaimed prizes.")
+            return
+        view.message = await ctx.send(embed=embed, view=view)
+
+    @commands.hybrid_command(name="xp_backfill")
+    @is_owner()
+    async def xp_backfill(self, ctx, restart: bool = False):
+        """
+        Rebuild XP from the message history of every channel, resuming an unfinished run.
+        Nobody's XP goes down; pass restart to throw away saved progress first.
+        """
+        if self.backfill_task is not None and not self.backfill_task.done():
+            await ctx.send(self.backfill_status())
+            return
+        if self.db is None:
+            await ctx.send("The levels database isn't ready yet.")
+            return
+        if restart:
+            await self.db.execute("DELETE FROM backfill_messages")
+            await self.db.execute("DELETE FROM backfill_channels")
+        status = await ctx.send("Starting XP backfill...")
+
+        async def run():
+            try:
+                await self.run_backfill(status)
+            except Exception as e:
+                print(f"XP backfill failed: {e}")
+                await self.report(status, f"XP backfill failed: {e}")
+
+        self.backfill_task = asyncio.create_task(run())
+
+    @commands.hybrid_command(name="sync_level_roles")
+    @commands.has_permissions(administrator=True)
+    async def sync_level_roles(self, ctx, restart: bool = False):
+        """
+        Give every member exactly the level roles their level earns, in the background.
+        Resumes an interrupted run; pass restart to start from the first member again.
+        """
+        task = self.role_sync_tasks.get(ctx.guild.id)
+        if task is not None and not task.done():
+            await ctx.send(self.role_sync_status(ctx.guild.id))
+            return
+        if self.db is None:
+            await ctx.send("The levels database isn't ready yet.")
+            return
+        status = await ctx.send("Starting level role sync...")
+
+        async def run():
+            try:
+                await self.run_role_sync(ctx.guild, status, restart)
+            except Exception as e:
+                print(f"Level role sync failed: {e}")
+                await self.report(status, f"Level role sync failed: {e}")
+
+        self.role_sync_tasks[ctx.guild.id] = asyncio.create_task(run())
+
+    @commands.hybrid_command(name="season")
+    async def season(self, ctx, page: int = 1, season: int = None):
+        """Display this season's leaderboard, or a past season's by number."""
+        page = max(1, page)
+        if season is None:
+            season_id, started_at = await self.current_season()
+            table = "season_xp"
+        else:
+            row = await self.db.fetchone("SELECT id, started_at, archive_table FROM seasons WHERE id = ?", (season,))
+            if row is None:
+                await ctx.send("There is no such season.")
+                return
+            season_id, started_at, table = row
+            table = table or "season_xp"
+
+        top = await self.top_season_members(ctx.guild, table, page)
+        if not top:
+            await ctx.send("No XP has been earned this season yet." if page == 1 else "There is no leaderboard page that far.")
+            return
+
+        embed = discord.Embed(title=season_name(season_id, started_at), color=discord.Color.blurple())
+        start = (page - 1) * LEADERBOARD_PAGE_SIZE + 1
+        for index, (member, xp) in enumerate(top, start=start):
+            embed.add_field(name=f"{index}. {member.display_name}", value=f"XP: ```{xp}```", inline=True)
+        embed.set_footer(text=f"Page {page} • Use /leaderboard for all-time standings")
+        await ctx.send(embed=embed)
+
+    @commands.hybrid_command(name="season_end")
+    @is_owner()
+    async def season_end(self, ctx):
+        """End the running season now and start the next one."""
+        ended, archive, new_id = await self.end_season()
+        await ctx.send(f"Season {ended} has ended and was archived to `{archive}`. Season {new_id} has begun!")
+
     @commands.hybrid_command(name="level")
     async def check_level(self, ctx, member: discord.Member = None):
         """Check the level of yourself or another user."""
@@ -160,29 +1169,119 @@ class LevelSystem(commands.Cog):
         xp_required = self.calculate_xp_required(level)
         await ctx.send(f"{member.mention}, you are at Level {level} with {xp}/{xp_required} XP.")
 
-    @commands.hybrid_command(name="leaderboard")
-    async def leaderboard(self, ctx):
-        """Display the top 10 users by level and XP who are in the server."""
-        async with self.db.execute("SELECT user_id, level, xp FROM levels ORDER BY level DESC, xp DESC") as cursor:
-            records = await cursor.fetchall()
+    @commands.hybrid_command(name="rank")
+    async def rank(self, ctx, member: discord.Member = None):
+        """Show where you or another user stands among everyone with XP."""
+        member = member or ctx.author
+        if self.rank_index is None:
+            await ctx.send("Rankings are still loading, try again in a moment.")
+            return
+        total_xp = await self.get_total_xp(member.id)
+        if member.id in self.unranked:
+            await ctx.send(f"{member.mention} isn't ranked yet. Send some messages to earn XP!")
+            return
 
-        server_records = [record for record in records if ctx.guild.get_member(record[0])]
-        top_ten = server_records[:10]
+        ranked = len(self.rank_index)
+        position = self.rank_index.count_greater(total_xp) + 1
+        level, xp = level_for_total_xp(total_xp)
+        message = (
+            f"{member.mention} is ranked **#{position}** of {ranked} (top {position / ranked * 100:.1f}%), "
+            f"at Level {level} with {xp}/{xp_required(level)} XP."
+        )
+        next_total = self.rank_index.next_greater(total_xp)
+        if next_total is None:
+            message += " Nobody has more XP!"
+        else:
+            message += f" {next_total - total_xp} XP to move up a rank."
+        await ctx.send(message)
 
-        if not top_ten:
-            await ctx.send("No leaderboard data available.")
+    @commands.hybrid_command(name="leaderboard")
+    async def leaderboard(self, ctx, page: int = 1):
+        """Display the top users by level and XP who are in the server, 10 per page."""
+        page = max(1, page)
+        key = (ctx.guild.id, page)
+        cached = self.leaderboard_cache.get(key)
+        if cached is not None and time.monotonic() - cached[2] < LEADERBOARD_TTL:
+            await ctx.send(embed=cached[0])
+            return
+
+        top, cursor = await self.top_members(ctx.guild, page, resume=self.leaderboard_resume(ctx.guild.id, page))
+        if not top:
+            await ctx.send("No leaderboard data available." if page == 1 else "There is no leaderboard page that far.")
             return
 
         embed = discord.Embed(title="Leaderboard", color=discord.Color.blurple())
-        for index, (user_id, level, xp) in enumerate(top_ten, start=1):
-            member = ctx.guild.get_member(user_id)
+        start = (page - 1) * LEADERBOARD_PAGE_SIZE + 1
+        for index, (member, level, xp, _) in enumerate(top, start=start):
             embed.add_field(
                 name=f"{index}. {member.display_name}",
                 value=f"Level: ```{level}```",
                 inline=True
             )
-        embed.set_footer(text="Keep leveling up!")
+        embed.set_footer(text=f"Page {page} • Keep leveling up!")
+        # A short page lists everyone left, so any XP change can alter it.
+        lowest = top[-1][3] if len(top) == LEADERBOARD_PAGE_SIZE else 0
+        self.leaderboard_cache[key] = (embed, lowest, time.monotonic(), cursor)
         await ctx.send(embed=embed)
 
+class PrizeAuditView(discord.ui.View):
+    """Pages through the prize audit, keeping the cursor of each page it has shown."""
+    def __init__(self, cog, author):
+        super().__init__(timeout=300)
+        self.cog = cog
+        self.author = author
+        self.cursors = [None]  # start cursor of each page up to the current one
+        self.next_cursor = None
+        self.message = None
+
+    async def render(self):
+        rows = await self.cog.prize_audit_page(self.cursors[-1], PRIZE_AUDIT_PAGE_SIZE + 1)
+        if not rows:
+            return None
+        has_next = len(rows) > PRIZE_AUDIT_PAGE_SIZE
+        rows = rows[:PRIZE_AUDIT_PAGE_SIZE]
+        self.next_cursor = (rows[-1][2], rows[-1][0])
+        self.previous_page.disabled = len(self.cursors) == 1
+        self.next_page.disabled = not has_next
+
+        embed = discord.Embed(title="Unclaimed Prizes", color=discord.Color.blurple())
+        for user_id, level, _, unclaimed in rows:
+            member = self.author.guild.get_member(user_id)
+            embed.add_field(
+                name=member.display_name if member else str(user_id),
+                value=f"<@{user_id}> • Level {level} • Unclaimed: {', '.join(map(str, unclaimed))}",
+                inline=False
+            )
+        embed.set_footer(text=f"Page {len(self.cursors)}")
+        return embed
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        return interaction.user.id == self.author.id
+
+    async def show(self, interaction):
+        embed = await self.render()
+        if embed is None:
+            await interaction.response.edit_message(content="Nobody has unclaimed prizes.", embed=None, view=None)
+            return
+        await interaction.response.edit_message(embed=embed, view=self)
+
+    @discord.ui.button(label="Previous", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if len(self.cursors) > 1:
+            self.cursors.pop()
+        await self.show(interaction)
+
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.cursors.append(self.next_cursor)
+        await self.show(interaction)
+
+    async def on_timeout(self):
+        if self.message is not None:
+            try:
+                await self.message.edit(view=None)
+            except discord.HTTPException:
+                pass
+
 async def setup(bot):
     await bot.add_cog(LevelSystem(bot))
\ No newline at end of file
@@ -1,18 +1,81 @@
-import discord, asyncio, json, re, yaml, os, pickle, aiohttp, aiofiles
+import discord, asyncio, json, re, yaml, os, time, aiohttp, aiofiles
+from concurrent.futures import ThreadPoolExecutor
 from discord.ext import commands, tasks
 from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Literal
+from helpers import database
 from helpers.checks import is_blacklisted, is_owner, load_blacklist
+from helpers.inference import BatchInference, ResultCache, content_key
+from helpers.moderation_model import has_model, load_model_dir, load_samples, validate
+from helpers.online_model import OnlineTrainer
+from helpers.moderation_rules import (
+    RulePipeline, ExtensionRule, IPAddressRule, WordFilterRule, ClassifierRule
+)
+from helpers.wordfilter import WordFilter, WordList
+
+PROHIBITED_EXTENSIONS = ['.exe', '.bat', '.msi', '.vbs', '.sh', '.cmd']
+INFERENCE_BATCH = 32  # most messages scored in one model call
+INFERENCE_DELAY = 0.01  # seconds a batch waits to fill up
+SCORE_CACHE_SIZE = 10000  # scored texts remembered (about 150 bytes each)
+SCORE_CACHE_TTL = None  # seconds a cached score stays valid; None keeps it until evicted
+MODEL_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
+MODEL_VERSIONS_DIR = os.path.join(MODEL_DIR, "models")  # data/models/<version>/ holds other model versions
+ONLINE_MODEL_DIR = os.path.join(MODEL_VERSIONS_DIR, "online")  # checkpoints of the online model; /modelreload online
+TRAIN_BATCH = 32  # labels that trigger an online update right away
+TRAIN_INTERVAL = 600  # seconds before fewer labels are trained on anyway
+CHECKPOINT_INTERVAL = 1800  # seconds between checkpoints of the online model
+REMOVE_WORDS_PATH = "data/remove_words.txt"  # terms stripped before scoring, one per line; reloaded when changed
+REMOVE_WORDS_POLL = 30  # seconds between checks of REMOVE_WORDS_PATH
+
+# Schema migrations for data/moderation.db, applied in order by helpers.database.
+MIGRATIONS = [
+    (
+        """
+        CREATE TABLE IF NOT EXISTS incidents (
+            id INTEGER PRIMARY KEY,
+            message_id INTEGER NOT NULL,
+            channel_id INTEGER NOT NULL,
+            author_id INTEGER NOT NULL,
+            content TEXT NOT NULL,
+            probability REAL NOT NULL,
+            model_version TEXT,
+            created_at TEXT NOT NULL
+        )
+        """,
+        # One row per label, in the order they were given; relabelling adds a row.
+        """
+        CREATE TABLE IF NOT EXISTS incident_labels (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            incident_id INTEGER NOT NULL REFERENCES incidents (id),
+            flagged INTEGER NOT NULL,
+            moderator_id INTEGER NOT NULL,
+            labelled_at TEXT NOT NULL
+        )
+        """,
+    ),
+]
 
 # Load configuration data from a YAML file
 def load_config():
     with open('config.yml', 'r') as f:
         return yaml.safe_load(f)
 
+@lru_cache(maxsize=8)
+def _word_filter(words):
+    return WordFilter(words)
+
 def remove_words(text, words):
-    if not words:
-        return text
-    pattern = re.compile(r'\b(' + '|'.join(map(re.escape, words)) + r')\b', flags=re.IGNORECASE)
-    return pattern.sub('', text)
+    """`text` without the terms in `words`, a list of terms or a compiled WordFilter."""
+    if not isinstance(words, WordFilter):
+        if not words:
+            return text
+        words = _word_filter(tuple(words))
+    return words.sub('', text)
+
+def normalize(text):
+    """Case and whitespace normalized text, the form the model scores and score_cache keys."""
+    return " ".join(text.lower().split())
 
 class Moderation(commands.Cog):
     def __init__(self, bot, threshold: float = 0.5, remove_list=None, log_channel_id: int = None):
@@ -22,17 +85,40 @@ class Moderation(commands.Cog):
         config = load_config()
         self.log_channel_id = config['channels']['moderation_log']
 
-        self.vectorizer = None  # Initialize to None
-        self.classifier = None  # Initialize to None
+        # The live model; None until loaded, and replaced as a whole by a reload.
+        self.model = None
+        self.model_loaded_at = None
+        self.unscored = 0  # messages skipped because no model was ready
+        self.reload_task = None
+        self.inference = BatchInference(self.predict_batch, INFERENCE_BATCH, INFERENCE_DELAY)
+        self.score_cache = ResultCache(SCORE_CACHE_SIZE, SCORE_CACHE_TTL)
+        # Flagged incidents and moderator labels (data/moderation.db), and the online model they train.
+        self.db = None
+        self.trainer = None
+        self.train_task = None
+        self.training_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="online-training")
+        self.labels_ready = asyncio.Event()
+        self.pending_labels = 0
+        # remove_list is used until REMOVE_WORDS_PATH exists.
+        self.word_list = WordList(REMOVE_WORDS_PATH, self.remove_list)
+        self.word_filter_rule = WordFilterRule(self.word_list.filter)
+        self.pipeline = RulePipeline([
+            ExtensionRule(PROHIBITED_EXTENSIONS),
+            IPAddressRule(),
+            self.word_filter_rule,
+            ClassifierRule(self.score, self.threshold),
+        ])
         self.load_model_task = asyncio.create_task(self.load_model())  # Create a task
 
     async def load_model(self):
-        base_dir = os.path.join(os.path.dirname(__file__), "..", "data")
-        vectorizer_path = os.path.join(base_dir, "moderation_vectorizer.pkl")
-        classifier_path = os.path.join(base_dir, "moderation_classifier.pkl")
+        """
+        Download the default model if needed and load it in a worker thread. A compact
+        copy in data/moderation_compact/ is used instead of the pickles when present.
+        """
+        base_dir = MODEL_DIR
 
         # Download the files if they don't exist
-        files_to_download = [
+        files_to_download = [] if has_model(base_dir) else [
             {"url": "https://github.com/Zluqe/Gluqe/raw/refs/heads/main/data/moderation_classifier.pkl", "filename": "moderation_classifier.pkl"},
             {"url": "https://github.com/Zluqe/Gluqe/raw/refs/heads/main/data/moderation_vectorizer.pkl", "filename": "moderation_vectorizer.pkl"},
         ]
@@ -60,41 +146,294 @@ class Moderation(commands.Cog):
                         return
 
         try:
-            with open(vectorizer_path, "rb") as vf:
-                self.vectorizer = pickle.load(vf)
-            with open(classifier_path, "rb") as cf:
-                self.classifier = pickle.load(cf)
-            print("Moderation model loaded successfully.")
+            model = await asyncio.to_thread(load_model_dir, base_dir)
         except Exception as e:
             print("Error loading moderation model:", e)
-            self.vectorizer = None
-            self.classifier = None
+            return
+        self.install_model(model)
+
+    def install_model(self, model):
+        """Make `model` live. Batches already running finish on the model they started with."""
+        self.model = model
+        self.model_loaded_at = datetime.now()
+        self.score_cache.clear()
+        print(
+            f"Moderation model {model.version} loaded in {model.load_seconds:.2f}s "
+            f"(~{model.memory_bytes / 1e6:.1f} MB)."
+        )
+
+    async def reload_model(self, version):
+        """
+        Load a model version in a worker thread and check it against the sample set.
+        Returns (model or None, summary); the caller decides whether to install it.
+        """
+        directory = MODEL_DIR if version is None else os.path.join(MODEL_VERSIONS_DIR, version)
+        online = directory == ONLINE_MODEL_DIR and self.trainer is not None
+        if online and not self.trainer.fitted:
+            return None, "the online model hasn't been trained on any labels yet"
+        if not online and not has_model(directory):
+            return None, f"no model files in `{directory}`"
+        try:
+            if online:
+                # The trainer's current weights, which may be ahead of its last checkpoint.
+                model = await self.in_training_thread(self.trainer.snapshot)
+            else:
+                model = await asyncio.to_thread(load_model_dir, directory, version)
+            ok, summary = await asyncio.to_thread(validate, model, load_samples(), self.threshold)
+        except Exception as e:
+            return None, f"failed to load: {e}"
+        return (model if ok else None), summary
 
     @commands.Cog.listener()
     async def on_ready(self):
+        if self.db is None:
+            self.db = await database.connect("data/moderation.db", "moderation", MIGRATIONS)
+            self.trainer = await self.in_training_thread(OnlineTrainer.load, ONLINE_MODEL_DIR)
+            self.bot.add_view(IncidentLabelView(self))
+            self.train_task = asyncio.create_task(self.train_loop())
+        if not self.reload_word_list.is_running():
+            self.reload_word_list.start()
         await self.load_model_task
 
+    @tasks.loop(seconds=REMOVE_WORDS_POLL)
+    async def reload_word_list(self):
+        """Rebuild the word filter in a worker thread when REMOVE_WORDS_PATH changes, then swap it in."""
+        try:
+            word_filter = await asyncio.to_thread(self.word_list.reload_if_changed)
+        except Exception as e:
+            print(f"Error loading {REMOVE_WORDS_PATH}:", e)
+            return
+        if word_filter is not None:
+            # Cached scores stay valid: they're keyed by the text left after filtering.
+            self.word_filter_rule.filter = word_filter
+            print(f"Word filter loaded with {len(word_filter)} terms.")
+
+    async def in_training_thread(self, fn, *args):
+        """Run `fn` on the one thread that touches the trainer, so updates and checkpoints never overlap."""
+        return await asyncio.get_running_loop().run_in_executor(self.training_executor, fn, *args)
+
+    async def record_incident(self, message, text, probability):
+        """Store a flagged message for moderators to label. Returns the incident id."""
+        async def run(conn):
+            cursor = await conn.execute(
+                """
+                INSERT INTO incidents (message_id, channel_id, author_id, content, probability, model_version, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    message.id, message.channel.id, message.author.id, text, probability,
+                    self.model.version if self.model is not None else None, datetime.now().isoformat()
+                )
+            )
+            return cursor.lastrowid
+        return await self.db.write(run)
+
+    async def label_incident(self, incident_id, flagged, moderator_id):
+        """
+        Record whether an incident deserved its flag. Returns False if there is no such incident.
+        The label is trained on by train_loop in the next batch.
+        """
+        async def run(conn):
+            async with conn.execute("SELECT 1 FROM incidents WHERE id = ?", (incident_id,)) as cursor:
+                if await cursor.fetchone() is None:
+                    return False
+            await conn.execute(
+                "INSERT INTO incident_labels (incident_id, flagged, moderator_id, labelled_at) VALUES (?, ?, ?, ?)",
+                (incident_id, int(flagged), moderator_id, datetime.now().isoformat())
+            )
+            return True
+
+        if not await self.db.write(run):
+            return False
+        self.pending_labels += 1
+        if self.pending_labels >= TRAIN_BATCH:
+            self.labels_ready.set()
+        return True
+
+    async def install_update(self, model):
+        """Swap in a newer snapshot of the live online model if it still passes the sample set."""
+        ok, summary = await asyncio.to_thread(validate, model, load_samples(), self.threshold)
+        if ok:
+            self.install_model(model)
+        else:
+            print(f"Online moderation model {model.version} not swapped in: {summary}.")
+
+    async def train_loop(self):
+        """
+        Feed new labels to the online model in batches: as soon as TRAIN_BATCH are waiting,
+        or whatever there is every TRAIN_INTERVAL seconds. Updates run in a worker thread;
+        if the online model is live, each update is swapped in. The trainer is checkpointed
+        every CHECKPOINT_INTERVAL seconds, and labels newer than the checkpoint are trained
+        on again after a restart.
+        """
+        trainer = self.trainer
+        last_checkpoint = time.monotonic()
+        while True:
+            try:
+                await asyncio.wait_for(self.labels_ready.wait(), TRAIN_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self.labels_ready.clear()
+            try:
+                while True:
+                    rows = await self.db.fetchall(
+                        """
+                        SELECT l.id, i.content, l.flagged FROM incident_labels l
+                        JOIN incidents i ON i.id = l.incident_id
+                        WHERE l.id > ? ORDER BY l.id LIMIT ?
+                        """,
+                        (trainer.last_label_id, TRAIN_BATCH)
+                    )
+                    if not rows:
+                        break
+                    self.pending_labels = max(0, self.pending_labels - len(rows))
+                    texts = [content for _, content, _ in rows]
+                    flagged = [bool(f) for _, _, f in rows]
+                    await self.in_training_thread(trainer.partial_fit, texts, flagged, rows[-1][0])
+                    if self.model is not None and self.model.kind == "online":
+                        await self.install_update(await self.in_training_thread(trainer.snapshot))
+                    if len(rows) < TRAIN_BATCH:
+                        break
+                if trainer.dirty and time.monotonic() - last_checkpoint >= CHECKPOINT_INTERVAL:
+                    await self.in_training_thread(trainer.checkpoint)
+                    last_checkpoint = time.monotonic()
+                    print(f"Checkpointed the online moderation model after {trainer.updates} updates.")
+            except Exception as e:
+                print("Error training the online moderation model:", e)
+
+    def predict_batch(self, texts):
+        """Flagged probability of each text. Runs in the inference thread, one model call per batch."""
+        model = self.model  # one model for the whole batch, even if a reload swaps it meanwhile
+        if model is None:
+            return [None] * len(texts)
+        return model.predict(texts)
+
+    async def score(self, text):
+        """
+        Flagged probability of already filtered text, or None if it can't be scored.
+        Text is case and whitespace normalized first, so repeats of the same message
+        are answered from score_cache without touching the model.
+        """
+        if self.model is None:
+            self.unscored += 1
+            return None
+        text = normalize(text)
+        try:
+            return await self.score_cache.get_or_compute(content_key(text), lambda: self.inference.score(text))
+        except Exception as e:
+            print("Error scoring message content:", e)
+            return None
+
+    async def cog_unload(self):
+        self.reload_word_list.cancel()
+        if self.reload_task is not None:
+            self.reload_task.cancel()
+        if self.train_task is not None:
+            self.train_task.cancel()
+            self.train_task = None
+        await self.inference.close()
+        if self.trainer is not None:
+            # Queued behind any update still running, so the checkpoint includes it.
+            await self.in_training_thread(lambda: self.trainer.checkpoint() if self.trainer.dirty else None)
+        self.training_executor.shutdown(wait=False)
+        if self.db is not None:
+            await database.release(self.db)
+            self.db = None
+
     @commands.Cog.listener()
-    async def on_message(self, message):
+    async def on_message(self, message: discord.Message):
         if message.author == self.bot.user:
             return
+        verdict = await self.pipeline.scan(message)
+        if verdict is None or verdict.action == "allow":
+            return
+        if verdict.action == "delete":
+            await self.delete_message(message, verdict.reason)
+        elif verdict.action == "flag":
+            await self.flag_message(message, verdict.score)
 
-        # Check for prohibited file extensions in attachments
-        prohibited_extensions = ['.exe', '.bat', '.msi', '.vbs', '.sh', '.cmd']
-        if any(attachment.filename.lower().endswith(tuple(prohibited_extensions)) for attachment in message.attachments):
-            warning_msg = (f"{message.author.mention}, your message was deleted because it contained an attachment "
-                           "with a prohibited file extension.")
+    async def delete_message(self, message, reason):
+        warning_msg = f"{message.author.mention}, your message was deleted because it contained {reason}."
+        try:
             await message.delete()
             await message.channel.send(warning_msg, delete_after=15)
+        except discord.HTTPException as e:
+            print("Error deleting message:", e)
+
+    async def flag_message(self, message, flagged_prob):
+        original_content = message.content.strip()
+        try:
+            # Stored as the classifier saw it, so labels train the online model on the same text.
+            text = normalize(remove_words(original_content, self.word_filter_rule.filter))
+            incident_id = await self.record_incident(message, text, flagged_prob) if self.db is not None else None
+
+            # await message.delete()
+            warn_message = (
+                f"{message.author.mention}, you message was flagged, nothing will be deleted, however, this incident has been logged.\n\nZluqe AI is still in development, please notify if there are any mistakes."
+            )
+            await message.channel.send(warn_message, delete_after=15)
+
+            if self.log_channel_id:
+                log_channel = self.bot.get_channel(self.log_channel_id)
+                if log_channel:
+                    embed = discord.Embed(title="Deleted Flagged Message", color=discord.Color.red())
+                    embed.add_field(name="User", value=str(message.author), inline=True)
+                    embed.add_field(name="Flagged Probability", value=f"{flagged_prob:.4f}", inline=True)
+                    embed.add_field(name="Content", value=original_content or "N/A", inline=False)
+                    if incident_id is None:
+                        await log_channel.send(embed=embed)
+                    else:
+                        embed.set_footer(text=f"Incident #{incident_id}")
+                        await log_channel.send(embed=embed, view=IncidentLabelView(self))
+                else:
+                    print(f"Logging channel with ID {self.log_channel_id} not found.")
+            else:
+                print("No logging channel ID provided.")
+        except Exception as e:
+            print("Error deleting flagged message:", e)
+
+    @commands.hybrid_command(name="modelreload")
+    @is_owner()
+    async def modelreload(self, ctx, version: str = None):
+        """
+        Load a moderation model in the background, check it against the sample set and
+        swap it in. `version` names a folder in data/models/; leave it out to reload data/.
+        """
+        if self.reload_task is not None and not self.reload_task.done():
+            await ctx.send("A model is already being loaded.")
             return
+        if version is not None and (os.sep in version or version.startswith(".")):
+            await ctx.send("Invalid version name.")
+            return
+        status = await ctx.send(f"Loading model {version or 'from data/'}...")
 
-        # Check for IP addresses (IPv4 format)
-        ip_pattern = r'\b(?:\d{1,3}\.){3}\d{1,3}\b'
-        if re.search(ip_pattern, message.content):
-            warning_msg = (f"{message.author.mention}, your message was deleted because it contained an IP address.")
-            await message.delete()
-            await message.channel.send(warning_msg, delete_after=15)
+        async def run():
+            model, summary = await self.reload_model(version)
+            if model is None:
+                await status.edit(content=f"Model not swapped in: {summary}.")
+                return
+            previous = self.model.version if self.model is not None else "none"
+            self.install_model(model)
+            await status.edit(content=(
+                f"Model {model.version} is live (was {previous}). Loaded in {model.load_seconds:.2f}s, "
+                f"~{model.memory_bytes / 1e6:.1f} MB; {summary}."
+            ))
+
+        self.reload_task = asyncio.create_task(run())
+
+    @commands.hybrid_command(name="modlabel")
+    @commands.has_permissions(manage_messages=True)
+    async def modlabel(self, ctx, incident: int, verdict: Literal["correct", "false_positive"]):
+        """
+        Label a flagged incident as a correct flag or a false positive; the online model learns from it.
+        """
+        if self.db is None:
+            await ctx.send("The moderation database isn't ready yet.")
+            return
+        if not await self.label_incident(incident, verdict == "correct", ctx.author.id):
+            await ctx.send(f"There is no incident #{incident}.")
             return
+        await ctx.send(f"Incident #{incident} labelled as {verdict.replace('_', ' ')}.")
 
     def save_blacklist(self, blacklist):
         with open('data/blacklist.json', 'w') as f:
@@ -132,60 +471,96 @@ class Moderation(commands.Cog):
         except Exception as e:
             print(e)
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
-        if message.author.bot:
-            return
-        if message.mentions:
-            return
-        original_content = message.content.strip()
-        if len(original_content) <= 2:
-            return
-        processed_content = remove_words(original_content, self.remove_list).strip()
-        if not processed_content:
+    @commands.hybrid_command(name="modstats")
+    @is_owner()
+    async def modstats(self, ctx):
+        """
+        Show how many messages each moderation rule has checked and decided, and its mean latency.
+        """
+        embed = discord.Embed(title="Moderation Rules", color=discord.Color.blurple())
+        for name, checked, hits, mean_us in self.pipeline.stats():
+            embed.add_field(
+                name=name,
+                value=f"Checked: {checked}\nHits: {hits}\nMean: {mean_us:.1f} µs",
+                inline=True
+            )
+        inference = self.inference.snapshot()
+        embed.add_field(
+            name="inference",
+            value=(
+                f"Batches: {inference['batches']} (mean {inference['mean_batch']:.1f}, max {inference['largest_batch']})\n"
+                f"Queue: {inference['queue_depth']}\n"
+                f"p50/p99: {inference['p50_ms']:.1f}/{inference['p99_ms']:.1f} ms\n"
+                f"Failed: {inference['failed']}"
+            ),
+            inline=False
+        )
+        model = self.model
+        embed.add_field(
+            name="model",
+            value=(
+                f"Version: {model.version} ({model.kind})\nLoaded: {self.model_loaded_at:%Y-%m-%d %H:%M} in {model.load_seconds:.2f}s\n"
+                f"Memory: ~{model.memory_bytes / 1e6:.1f} MB"
+                if model is not None else "Not loaded"
+            ) + f"\nUnscored (no model): {self.unscored}",
+            inline=False
+        )
+        trainer = self.trainer
+        if trainer is not None:
+            embed.add_field(
+                name="online model",
+                value=(
+                    f"Updates: {trainer.updates} ({trainer.samples} labels)\n"
+                    f"Waiting: {self.pending_labels}\n"
+                    f"Checkpointed: {'yes' if not trainer.dirty else 'no'}"
+                ),
+                inline=False
+            )
+        cache = self.score_cache.snapshot()
+        embed.add_field(
+            name="score cache",
+            value=(
+                f"Hit rate: {cache['hit_rate']:.1%} ({cache['hits']} hits, {cache['misses']} misses)\n"
+                f"Size: {cache['size']}/{SCORE_CACHE_SIZE}\n"
+                f"Evicted: {cache['evictions']}, expired: {cache['expired']}"
+            ),
+            inline=False
+        )
+        embed.set_footer(text="Rules run top to bottom; the first hit ends the scan.")
+        await ctx.send(embed=embed)
+
+class IncidentLabelButton(discord.ui.Button):
+    def __init__(self, cog, flagged):
+        super().__init__(
+            label="Correct" if flagged else "False positive",
+            style=discord.ButtonStyle.red if flagged else discord.ButtonStyle.secondary,
+            custom_id="incident_label_correct" if flagged else "incident_label_false_positive"
+        )
+        self.cog = cog
+        self.flagged = flagged
+
+    async def callback(self, interaction: discord.Interaction):
+        if not interaction.user.guild_permissions.manage_messages:
+            await interaction.response.send_message("You don't have permission to label incidents.", ephemeral=True)
             return
-        try:
-            X = self.vectorizer.transform([processed_content])
-        except Exception as e:
-            print("Error processing message content:", e)
+        embed = interaction.message.embeds[0] if interaction.message.embeds else None
+        match = re.match(r"Incident #(\d+)", embed.footer.text or "") if embed is not None else None
+        if match is None or self.cog.db is None:
+            await interaction.response.send_message("This incident can't be labelled.", ephemeral=True)
             return
-        try:
-            probabilities = self.classifier.predict_proba(X)[0]
-        except Exception as e:
-            print("Error predicting message probabilities:", e)
+        incident_id = int(match.group(1))
+        if not await self.cog.label_incident(incident_id, self.flagged, interaction.user.id):
+            await interaction.response.send_message(f"There is no incident #{incident_id}.", ephemeral=True)
             return
+        embed.set_footer(text=f"Incident #{incident_id} • {self.label} ({interaction.user})")
+        await interaction.response.edit_message(embed=embed)
 
-        flagged_idx = None
-        for idx, cls_label in enumerate(self.classifier.classes_):
-            if cls_label == "FLAGGED":
-                flagged_idx = idx
-                break
-        if flagged_idx is None:
-            flagged_idx = 1
-
-        flagged_prob = probabilities[flagged_idx]
-        if flagged_prob >= self.threshold:
-            try:
-                # await message.delete()
-                warn_message = (
-                    f"{message.author.mention}, you message was flagged, nothing will be deleted, however, this incident has been logged.\n\nZluqe AI is still in development, please notify if there are any mistakes."
-                )
-                await message.channel.send(warn_message, delete_after=15)
-                
-                if self.log_channel_id:
-                    log_channel = self.bot.get_channel(self.log_channel_id)
-                    if log_channel:
-                        embed = discord.Embed(title="Deleted Flagged Message", color=discord.Color.red())
-                        embed.add_field(name="User", value=str(message.author), inline=True)
-                        embed.add_field(name="Flagged Probability", value=f"{flagged_prob:.4f}", inline=True)
-                        embed.add_field(name="Content", value=original_content or "N/A", inline=False)
-                        await log_channel.send(embed=embed)
-                    else:
-                        print(f"Logging channel with ID {self.log_channel_id} not found.")
-                else:
-                    print("No logging channel ID provided.")
-            except Exception as e:
-                print("Error deleting flagged message:", e)
+class IncidentLabelView(discord.ui.View):
+    """Correct / False positive buttons on flagged message logs. Persistent; the incident id is in the footer."""
+    def __init__(self, cog):
+        super().__init__(timeout=None)
+        self.add_item(IncidentLabelButton(cog, True))
+        self.add_item(IncidentLabelButton(cog, False))
 
 async def setup(bot):
     await bot.add_cog(Moderation(bot, threshold=0.5))
\ No newline at end of file
@@ -1,43 +1,375 @@
 import discord, yaml, os, random, time, asyncio
-import aiosqlite
-from discord.ext import commands
+from discord.ext import commands, tasks
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
+from helpers.checks import is_owner
+from helpers import database
+from helpers.scheduler import get_scheduler
+
+OFFLINE_EXPIRY = 259200  # 3 days
+FLUSH_INTERVAL = 0.5  # seconds between write-behind flushes
+FLUSH_MAX_ROWS = 500  # flush early once this many users are pending
+SWEEP_INTERVAL = 15  # minutes between expiry sweeps
+QUALIFY_PERIOD = 7 * 24 * 60 * 60  # how long a status must be held before it can win
+MAX_DRAW_ATTEMPTS = 10  # redraws allowed when the winner has left the guild
+GUILD_CONCURRENCY = 2  # guilds reconciled/swept/drawn at the same time
+DEFAULT_ANNOUNCEMENT_CHANNEL_ID = 1324991765970817134
+
+# Schema migrations for data/monitor_status.db, applied in order by helpers.database.
+# credit_drop stores eligible user IDs along with:
+#   - offline_since: when they went offline (if applicable),
+#   - qualified_since: when they last qualified with the required status,
+#   - last_status: the text of the qualifying custom status.
+MIGRATIONS = [
+    (
+        """
+        CREATE TABLE IF NOT EXISTS credit_drop (
+            user_id INTEGER PRIMARY KEY,
+            offline_since INTEGER,
+            qualified_since INTEGER,
+            last_status TEXT
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_qualified_since ON credit_drop(qualified_since)",
+    ),
+    (
+        "CREATE INDEX IF NOT EXISTS idx_offline_since ON credit_drop(offline_since)",
+    ),
+    (
+        """
+        CREATE TABLE IF NOT EXISTS credit_drop_history (
+            id INTEGER PRIMARY KEY,
+            drawn_at INTEGER NOT NULL,
+            user_id INTEGER,
+            credits INTEGER,
+            eligible INTEGER NOT NULL,
+            attempts INTEGER NOT NULL
+        )
+        """,
+    ),
+    # Partition by guild. Rows from before this migration get guild_id 0 and are
+    # adopted by the first configured guild on the next on_ready.
+    (
+        """
+        CREATE TABLE credit_drop_new (
+            guild_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            offline_since INTEGER,
+            qualified_since INTEGER,
+            last_status TEXT,
+            PRIMARY KEY (guild_id, user_id)
+        )
+        """,
+        """
+        INSERT INTO credit_drop_new (guild_id, user_id, offline_since, qualified_since, last_status)
+        SELECT 0, user_id, offline_since, qualified_since, last_status FROM credit_drop
+        """,
+        "DROP TABLE credit_drop",
+        "ALTER TABLE credit_drop_new RENAME TO credit_drop",
+        "CREATE INDEX idx_qualified_since ON credit_drop(guild_id, qualified_since, user_id)",
+        "CREATE INDEX idx_offline_since ON credit_drop(guild_id, offline_since)",
+        "ALTER TABLE credit_drop_history ADD COLUMN guild_id INTEGER",
+    ),
+]
 
 def load_config():
     with open('config.yml', 'r') as f:
         return yaml.safe_load(f)
 
+def load_announcement_channels():
+    """
+    Return (guild_id, announcement channel ID) for every guild the credit drop runs in,
+    from credit_drop.guilds in config.yml. Falls back to the original Zluqe channel,
+    whose guild isn't checked (guild_id None).
+    """
+    try:
+        guilds = (load_config().get('credit_drop') or {}).get('guilds') or []
+    except FileNotFoundError:
+        guilds = []
+    channels = [
+        (guild.get('guild_id'), guild['announcement_channel_id'])
+        for guild in guilds if guild.get('announcement_channel_id')
+    ]
+    return channels or [(None, DEFAULT_ANNOUNCEMENT_CHANNEL_ID)]
+
 class CreditDropMonitor(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.announcement_channel_id = 1324991765970817134
+        self.announcement_channels = load_announcement_channels()
         self.db = None
+        # guild_id -> announcement channel, filled in on_ready
+        self.channels = {}
+        self.guild_slots = asyncio.Semaphore(GUILD_CONCURRENCY)
+        self.scheduler = get_scheduler(bot)
+
+        # In-memory mirror of credit_drop ((guild_id, user_id) -> (offline_since, qualified_since, last_status))
+        # and the write-behind buffer of rows waiting to be flushed (None means delete).
+        self.rows = {}
+        self.pending = {}
+        self.flush_lock = asyncio.Lock()
+        self.flush_task = None
+        # guild_id -> users staged while that guild is being reconciled, see reconcile().
+        self.reconciling = {}
+        # Last eligibility signature we acted on per (guild_id, user_id), see eligibility_signature().
+        self.signatures = {}
+        self.stats = {"events": 0, "skipped": 0, "processed": 0, "rows_staged": 0, "rows_written": 0, "flushes": 0,
+                      "sweeps": 0, "expired": 0, "purged": 0, "vacuumed_pages": 0}
+        self.last_reconcile = {}
 
         if not os.path.exists("data"):
             os.makedirs("data")
 
     async def init_db(self):
-        self.db = await aiosqlite.connect("data/monitor_status.db")
-        await self._create_table()
-
-    async def _create_table(self):
-        """
-        Create (or update) the table to store eligible user IDs along with:
-          - offline_since: when they went offline (if applicable),
-          - qualified_since: when they last qualified with the required status,
-          - last_status: the text of the qualifying custom status.
-        """
-        await self.db.execute("""
-            CREATE TABLE IF NOT EXISTS credit_drop (
-                user_id INTEGER PRIMARY KEY,
-                offline_since INTEGER,
-                qualified_since INTEGER,
-                last_status TEXT
+        self.db = await database.connect("data/monitor_status.db", "monitor", MIGRATIONS)
+        await self.db.enable_incremental_vacuum()
+        await self._load_rows()
+        self.flush_loop.start()
+        self.sweep_loop.start()
+
+    async def cog_unload(self):
+        """
+        Stop the flush loop and write out anything still buffered before the cog goes away.
+        """
+        self.flush_loop.cancel()
+        self.sweep_loop.cancel()
+        if self.db is not None:
+            await self.flush()
+            await database.release(self.db)
+            self.db = None
+
+    async def _load_rows(self):
+        """Load the whole credit_drop table into the in-memory mirror."""
+        rows = await self.db.fetchall(
+            "SELECT guild_id, user_id, offline_since, qualified_since, last_status FROM credit_drop"
+        )
+        self.rows = {(row[0], row[1]): tuple(row[2:]) for row in rows}
+
+    def stage(self, key, row):
+        """
+        Record the new state of a (guild_id, user_id) row in the mirror and the write-behind
+        buffer. Repeated updates for the same key before a flush collapse into a single write.
+        """
+        if row is None:
+            self.rows.pop(key, None)
+        else:
+            self.rows[key] = row
+        self.pending[key] = row
+        touched = self.reconciling.get(key[0])
+        if touched is not None:
+            touched.add(key[1])
+        self.stats["rows_staged"] += 1
+        if len(self.pending) >= FLUSH_MAX_ROWS and (self.flush_task is None or self.flush_task.done()):
+            self.flush_task = asyncio.create_task(self.flush())
+
+    async def flush(self):
+        """
+        Write every buffered row to the database in a single transaction.
+        Returns the number of rows written.
+        """
+        async with self.flush_lock:
+            return await self.flush_unlocked()
+
+    async def flush_unlocked(self):
+        """Flush the buffer; the caller must hold flush_lock."""
+        if not self.pending or self.db is None:
+            return 0
+        pending, self.pending = self.pending, {}
+        upserts = [(*key, *row) for key, row in pending.items() if row is not None]
+        deletes = [key for key, row in pending.items() if row is None]
+
+        async def write(conn):
+            if upserts:
+                await conn.executemany("""
+                    INSERT INTO credit_drop (guild_id, user_id, offline_since, qualified_since, last_status)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(guild_id, user_id) DO UPDATE SET
+                        offline_since = excluded.offline_since,
+                        qualified_since = excluded.qualified_since,
+                        last_status = excluded.last_status
+                """, upserts)
+            if deletes:
+                await conn.executemany("DELETE FROM credit_drop WHERE guild_id = ? AND user_id = ?", deletes)
+
+        try:
+            await self.db.write(write)
+        except Exception as e:
+            # Put the rows back unless a newer state was staged while we were writing.
+            for key, row in pending.items():
+                self.pending.setdefault(key, row)
+            print(f"Failed to flush credit drop buffer: {e}")
+            return 0
+        self.stats["rows_written"] += len(pending)
+        self.stats["flushes"] += 1
+        return len(pending)
+
+    @tasks.loop(seconds=FLUSH_INTERVAL)
+    async def flush_loop(self):
+        await self.flush()
+
+    async def for_each_guild(self, fn):
+        """
+        Run `fn(guild_id, channel)` for every configured guild, at most GUILD_CONCURRENCY
+        at a time, so one huge guild doesn't hold up the others.
+        """
+        async def run(guild_id, channel):
+            async with self.guild_slots:
+                try:
+                    await fn(guild_id, channel)
+                except Exception as e:
+                    print(f"Credit drop task {fn.__name__} failed for guild {guild_id}: {e}")
+
+        await asyncio.gather(*(run(guild_id, channel) for guild_id, channel in self.channels.items()))
+
+    async def sweep(self, guild_id: int, channel=None):
+        """
+        Delete every row in the guild that has been offline for longer than OFFLINE_EXPIRY
+        with one range DELETE on idx_offline_since.
+        """
+        cutoff = int(time.time()) - OFFLINE_EXPIRY
+        async with self.flush_lock:
+            await self.flush_unlocked()
+            deleted = await self.db.execute(
+                "DELETE FROM credit_drop WHERE guild_id = ? AND offline_since <= ?", (guild_id, cutoff)
+            )
+            expired = [
+                key for key, row in self.rows.items()
+                if key[0] == guild_id and row[0] is not None and row[0] <= cutoff
+            ]
+            for key in expired:
+                # Anything staged since the DELETE started is newer and will be flushed as usual.
+                if key not in self.pending:
+                    self.rows.pop(key, None)
+        self.stats["expired"] += deleted
+        if deleted:
+            print(f"Removed {deleted} users from guild {guild_id} after being offline > 3 days.")
+
+    async def sweep_all(self):
+        """Sweep every guild, then give the freed pages back to the filesystem."""
+        await self.for_each_guild(self.sweep)
+        self.stats["sweeps"] += 1
+        try:
+            self.stats["vacuumed_pages"] += await self.db.incremental_vacuum()
+        except Exception as e:
+            print(f"Failed to vacuum credit drop database: {e}")
+
+    @tasks.loop(minutes=SWEEP_INTERVAL)
+    async def sweep_loop(self):
+        await self.sweep_all()
+
+    @sweep_loop.before_loop
+    async def before_sweep_loop(self):
+        await self.bot.wait_until_ready()
+
+    def next_row(self, member: discord.Member, row, current_time: int):
+        """
+        Work out what a member's credit_drop row should be from their current presence
+        and their existing row (None if they have none). Returns None if the member
+        should not have a row.
+        """
+        current_status = self.get_qualifying_status(member)
+        offline = member.status == discord.Status.offline
+        if current_status is not None:
+            if offline:
+                offline_since = current_time if row is None or row[0] is None else row[0]
+            else:
+                offline_since = None
+            if row is None or row[2] != current_status:
+                qualified_since = current_time
+            else:
+                qualified_since = row[1]
+            return (offline_since, qualified_since, current_status)
+        if not offline or row is None:
+            return None
+        if row[0] is None:
+            return (current_time, row[1], row[2])
+        if current_time - row[0] >= OFFLINE_EXPIRY:
+            return None
+        return row
+
+    async def reconcile(self, guild_id: int, channel=None):
+        """
+        Bring the guild's credit_drop rows in line with its live member list.
+        The guild's rows are loaded in one query, the inserts/updates/deletes are worked
+        out in Python and applied as a handful of executemany batches in one transaction.
+        Rows for users who are no longer in the guild are deleted. Users whose presence
+        changes while the scan runs are left to the write-behind buffer, which is newer.
+        """
+        guild = self.bot.get_guild(guild_id)
+        if guild is None:
+            return
+        started = time.perf_counter()
+        self.reconciling[guild_id] = touched = set()
+        try:
+            await self.flush()
+            rows = await self.db.fetchall(
+                "SELECT user_id, offline_since, qualified_since, last_status FROM credit_drop WHERE guild_id = ?",
+                (guild_id,)
             )
-        """)
-        await self.db.execute("CREATE INDEX IF NOT EXISTS idx_qualified_since ON credit_drop(qualified_since)")
-        await self.db.commit()
+            stored = {row[0]: tuple(row[1:]) for row in rows}
+            current_time = int(time.time())
+            inserts, updates, deletes = [], [], []
+            seen = set()
+            for i, member in enumerate(guild.members):
+                user_id = member.id
+                seen.add(user_id)
+                self.signatures[(guild_id, user_id)] = self.eligibility_signature(member)
+                row = stored.get(user_id)
+                new_row = self.next_row(member, row, current_time)
+                if new_row != row:
+                    if row is None:
+                        inserts.append((guild_id, user_id, *new_row))
+                    elif new_row is None:
+                        deletes.append((guild_id, user_id))
+                    else:
+                        updates.append((*new_row, guild_id, user_id))
+                if i % 5000 == 0:
+                    await asyncio.sleep(0)
+            deletes.extend((guild_id, user_id) for user_id in stored if user_id not in seen)
+
+            inserts = [row for row in inserts if row[1] not in touched]
+            updates = [row for row in updates if row[-1] not in touched]
+            deletes = [key for key in deletes if key[1] not in touched]
+
+            async def write(conn):
+                if inserts:
+                    await conn.executemany(
+                        "INSERT INTO credit_drop (guild_id, user_id, offline_since, qualified_since, last_status) VALUES (?, ?, ?, ?, ?)",
+                        inserts
+                    )
+                if updates:
+                    await conn.executemany(
+                        "UPDATE credit_drop SET offline_since = ?, qualified_since = ?, last_status = ? WHERE guild_id = ? AND user_id = ?",
+                        updates
+                    )
+                if deletes:
+                    await conn.executemany("DELETE FROM credit_drop WHERE guild_id = ? AND user_id = ?", deletes)
+
+            await self.db.write(write)
+
+            for _, user_id, *row in inserts:
+                if user_id not in touched:
+                    self.rows[(guild_id, user_id)] = tuple(row)
+            for *row, _, user_id in updates:
+                if user_id not in touched:
+                    self.rows[(guild_id, user_id)] = tuple(row)
+            for key in deletes:
+                if key[1] not in touched:
+                    self.rows.pop(key, None)
+        finally:
+            del self.reconciling[guild_id]
+
+        elapsed = time.perf_counter() - started
+        self.last_reconcile[guild_id] = {
+            "members": len(seen),
+            "inserted": len(inserts),
+            "updated": len(updates),
+            "deleted": len(deletes),
+            "seconds": elapsed,
+        }
+        print(
+            f"Reconciled credit drop database for {len(seen)} members of {guild} in {elapsed:.2f}s: "
+            f"{len(inserts)} inserted, {len(updates)} updated, {len(deletes)} deleted."
+        )
 
     def get_qualifying_status(self, member: discord.Member) -> str:
         """
@@ -52,6 +384,13 @@ class CreditDropMonitor(commands.Cog):
                     return activity.name
         return None
 
+    def eligibility_signature(self, member: discord.Member):
+        """
+        The only parts of a member's presence that credit drop eligibility depends on:
+        the qualifying status text (or None) and whether they are offline.
+        """
+        return (self.get_qualifying_status(member), member.status == discord.Status.offline)
+
     def qualifies(self, member: discord.Member) -> bool:
         """
         Determines if the member qualifies by having the required custom status.
@@ -61,208 +400,153 @@ class CreditDropMonitor(commands.Cog):
     @commands.Cog.listener()
     async def on_presence_update(self, before: discord.Member, after: discord.Member):
         """
-        Update the credit drop database on presence changes.
-        """
-        user_id = after.id
-        current_time = int(time.time())
-        qualifies = self.qualifies(after)
-        current_status = self.get_qualifying_status(after) if qualifies else None
-
-        if qualifies:
-            if after.status == discord.Status.offline:
-                async with self.db.execute(
-                    "SELECT offline_since, qualified_since, last_status FROM credit_drop WHERE user_id = ?",
-                    (user_id,)
-                ) as cursor:
-                    row = await cursor.fetchone()
-                if row is None or row[0] is None:
-                    offline_since = current_time
-                else:
-                    offline_since = row[0]
-            else:
-                offline_since = None
+        Update the credit drop mirror on presence changes. The database write is
+        buffered and flushed in batches by flush_loop.
+        """
+        if self.db is None or after.guild.id not in self.channels:
+            return
+        self.stats["events"] += 1
+        key = (after.guild.id, after.id)
 
-            async with self.db.execute(
-                "SELECT qualified_since, last_status FROM credit_drop WHERE user_id = ?",
-                (user_id,)
-            ) as cursor:
-                row = await cursor.fetchone()
+        # Most presence events are game/Spotify/etc. changes that leave the signature alone.
+        signature = self.eligibility_signature(after)
+        known = self.signatures.get(key)
+        if known is None:
+            known = self.eligibility_signature(before)
+        if signature == known:
+            self.stats["skipped"] += 1
+            return
+        self.signatures[key] = signature
+        self.stats["processed"] += 1
 
-            if row is None:
-                await self.db.execute(
-                    "INSERT INTO credit_drop (user_id, offline_since, qualified_since, last_status) VALUES (?, ?, ?, ?)",
-                    (user_id, offline_since, current_time, current_status)
-                )
-            else:
-                old_qualified_since, old_status = row
-                qualified_since = current_time if old_status != current_status else old_qualified_since
-                await self.db.execute(
-                    "UPDATE credit_drop SET offline_since = ?, qualified_since = ?, last_status = ? WHERE user_id = ?",
-                    (offline_since, qualified_since, current_status, user_id)
-                )
-            await self.db.commit()
-        else:
-            if after.status == discord.Status.offline:
-                async with self.db.execute(
-                    "SELECT offline_since FROM credit_drop WHERE user_id = ?",
-                    (user_id,)
-                ) as cursor:
-                    row = await cursor.fetchone()
-                if row is not None:
-                    offline_since = row[0]
-                    if offline_since is None:
-                        await self.db.execute(
-                            "UPDATE credit_drop SET offline_since = ? WHERE user_id = ?",
-                            (current_time, user_id)
-                        )
-                        await self.db.commit()
-                    else:
-                        if current_time - offline_since >= 259200:
-                            await self.db.execute("DELETE FROM credit_drop WHERE user_id = ?", (user_id,))
-                            await self.db.commit()
-                            print(f"Removed {after} after being offline > 3 days and not qualifying.")
-            else:
-                await self.db.execute("DELETE FROM credit_drop WHERE user_id = ?", (user_id,))
-                await self.db.commit()
+        row = self.rows.get(key)
+        new_row = self.next_row(after, row, int(time.time()))
+        if new_row == row:
+            return
+        self.stage(key, new_row)
+        if new_row is None and row is not None and after.status == discord.Status.offline:
+            print(f"Removed {after} after being offline > 3 days and not qualifying.")
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member):
+        """
+        Drop departed members straight away instead of waiting for the next reconcile.
+        """
+        if self.db is None or member.guild.id not in self.channels:
+            return
+        key = (member.guild.id, member.id)
+        self.signatures.pop(key, None)
+        if key in self.rows:
+            self.stage(key, None)
+            self.stats["purged"] += 1
 
     @commands.Cog.listener()
     async def on_ready(self):
         """
-        On bot ready, scan through all members in the announcement channel's guild and update the database.
+        On bot ready, reconcile the database against the members of every configured guild.
         Then start the scheduling task for the monthly credit drop.
-        This version processes members in batches to avoid blocking the event loop.
         """
         if self.db is None:
             await self.init_db()
 
-        channel = self.bot.get_channel(self.announcement_channel_id)
-        if channel is None:
-            try:
-                channel = await self.bot.fetch_channel(self.announcement_channel_id)
-            except Exception as e:
-                print(f"Failed to fetch channel with id {self.announcement_channel_id}: {e}")
-                return
-
-        guild = channel.guild
-        current_time = int(time.time())
-        members = guild.members
-        total = len(members)
-        print(f"Updating credit drop database for {total} members.")
-
-        for i, member in enumerate(members):
-            user_id = member.id
-            if self.qualifies(member):
-                current_status = self.get_qualifying_status(member)
-                if member.status == discord.Status.offline:
-                    async with self.db.execute("SELECT offline_since FROM credit_drop WHERE user_id = ?", (user_id,)) as cursor:
-                        row = await cursor.fetchone()
-                    offline_since = current_time if (row is None or row[0] is None) else row[0]
-                else:
-                    offline_since = None
-                async with self.db.execute("SELECT qualified_since, last_status FROM credit_drop WHERE user_id = ?", (user_id,)) as cursor:
-                    row = await cursor.fetchone()
-                if row is None:
-                    await self.db.execute(
-                        "INSERT INTO credit_drop (user_id, offline_since, qualified_since, last_status) VALUES (?, ?, ?, ?)",
-                        (user_id, offline_since, current_time, current_status)
-                    )
-                else:
-                    old_qualified_since, old_status = row
-                    if old_status != current_status:
-                        await self.db.execute(
-                            "UPDATE credit_drop SET offline_since = ?, qualified_since = ?, last_status = ? WHERE user_id = ?",
-                            (offline_since, current_time, current_status, user_id)
-                        )
-                    else:
-                        await self.db.execute(
-                            "UPDATE credit_drop SET offline_since = ? WHERE user_id = ?",
-                            (offline_since, user_id)
-                        )
-            else:
-                if member.status == discord.Status.offline:
-                    async with self.db.execute("SELECT offline_since FROM credit_drop WHERE user_id = ?", (user_id,)) as cursor:
-                        row = await cursor.fetchone()
-                    if row is not None:
-                        if row[0] is None:
-                            await self.db.execute("UPDATE credit_drop SET offline_since = ? WHERE user_id = ?", (current_time, user_id))
-                        else:
-                            if current_time - row[0] >= 259200:
-                                await self.db.execute("DELETE FROM credit_drop WHERE user_id = ?", (user_id,))
-                else:
-                    await self.db.execute("DELETE FROM credit_drop WHERE user_id = ?", (user_id,))
-            if i % 100 == 0:
-                await asyncio.sleep(0)
-        await self.db.commit()
-        print("Initial credit drop database updated on ready.")
+        for guild_id, channel_id in self.announcement_channels:
+            channel = self.bot.get_channel(channel_id)
+            if channel is None:
+                try:
+                    channel = await self.bot.fetch_channel(channel_id)
+                except Exception as e:
+                    print(f"Failed to fetch channel with id {channel_id}: {e}")
+                    continue
+            if guild_id is not None and channel.guild.id != guild_id:
+                print(
+                    f"Skipping credit drop for guild {guild_id}: announcement channel {channel_id} "
+                    f"belongs to guild {channel.guild.id}. Fix credit_drop.guilds in config.yml."
+                )
+                continue
+            self.channels[channel.guild.id] = channel
+        if not self.channels:
+            return
+
+        # Rows from before the table was partitioned by guild belong to the first guild.
+        first_guild_id = next(iter(self.channels))
+        adopted = await self.db.execute("UPDATE credit_drop SET guild_id = ? WHERE guild_id = 0", (first_guild_id,))
+        if adopted:
+            await self._load_rows()
+            print(f"Moved {adopted} credit drop rows to guild {first_guild_id}.")
 
-        asyncio.create_task(self.schedule_credit_drop())
+        await self.for_each_guild(self.reconcile)
 
-    async def schedule_credit_drop(self):
+        # Registered only now so a drop that came due while we were offline waits for the channels.
+        self.scheduler.register("creditdrop.monthly", self.run_scheduled_credit_drop)
+        if self.scheduler.get("creditdrop:monthly") is None:
+            self.schedule_credit_drop()
+
+    def schedule_credit_drop(self):
         """
-        Schedule the monthly credit drop using CST.
-        The drop is set for midnight on the 1st day of each month (Central Time).
-        This function calculates the delay until the scheduled time, sleeps until then,
-        and then performs the credit drop. It repeats indefinitely.
+        Schedule the next monthly credit drop using CST.
+        The drop is set for midnight on the 1st day of each month (Central Time) and is
+        kept by the shared scheduler, so a drop missed while the bot was down still runs.
         """
-        while True:
-            now = datetime.now(ZoneInfo("America/Chicago"))
-            drop_day = 1
-            drop_hour = 0
-            drop_minute = 0
-            drop_second = 0
+        now = datetime.now(ZoneInfo("America/Chicago"))
+        drop_day = 1
+        drop_hour = 0
+        drop_minute = 0
+        drop_second = 0
+
+        year = now.year
+        month = now.month
+        scheduled = datetime(year, month, drop_day, drop_hour, drop_minute, drop_second, tzinfo=ZoneInfo("America/Chicago"))
 
-            year = now.year
-            month = now.month
+        if now >= scheduled:
+            if month == 12:
+                year += 1
+                month = 1
+            else:
+                month += 1
             scheduled = datetime(year, month, drop_day, drop_hour, drop_minute, drop_second, tzinfo=ZoneInfo("America/Chicago"))
 
-            if now >= scheduled:
-                if month == 12:
-                    year += 1
-                    month = 1
-                else:
-                    month += 1
-                scheduled = datetime(year, month, drop_day, drop_hour, drop_minute, drop_second, tzinfo=ZoneInfo("America/Chicago"))
+        self.scheduler.schedule("creditdrop:monthly", scheduled, "creditdrop.monthly")
+        print(f"Next credit drop scheduled at {scheduled} CST.")
 
-            delay = (scheduled - now).total_seconds()
-            print(f"Next credit drop scheduled at {scheduled} CST. Waiting {delay:.0f} seconds.")
-            await asyncio.sleep(delay)
-            await self.perform_credit_drop()
+    async def run_scheduled_credit_drop(self, name, payload):
+        self.schedule_credit_drop()
+        await self.for_each_guild(self.perform_credit_drop)
 
-    async def perform_credit_drop(self):
+    async def perform_credit_drop(self, guild_id: int, channel):
         """
-        Execute the credit drop:
+        Execute the credit drop for one guild:
           - Query the database for eligible users (only those with qualified_since at least 7 days old),
             letting SQL do the filtering.
           - Randomly select one user.
           - Generate a random credit amount between 250 and 850.
-          - Announce the winner in the designated channel.
-        """
-        channel = self.bot.get_channel(self.announcement_channel_id)
-        if channel is None:
-            try:
-                channel = await self.bot.fetch_channel(self.announcement_channel_id)
-            except Exception as e:
-                print(f"Failed to fetch channel with id {self.announcement_channel_id}: {e}")
-                return
-
-        current_time = int(time.time())
-        seven_days = 7 * 24 * 60 * 60
-
-        async with self.db.execute(
-            "SELECT user_id FROM credit_drop WHERE qualified_since IS NOT NULL AND (? - qualified_since) >= ?",
-            (current_time, seven_days)
-        ) as cursor:
-            rows = await cursor.fetchall()
-
-        if not rows:
-            print("No eligible users after filtering for recent status changes.")
-            return
+          - Announce the winner in the guild's announcement channel.
+        """
+        await self.flush()
+        drawn_at = int(time.time())
+        cutoff = drawn_at - QUALIFY_PERIOD
+        member = None
+        eligible = 0
+        attempts = 0
+        while member is None and attempts < MAX_DRAW_ATTEMPTS:
+            attempts += 1
+            user_id, eligible = await self.draw_eligible(self.db, guild_id, cutoff)
+            if not eligible:
+                break
+            if user_id is None:
+                continue
+            member = channel.guild.get_member(user_id)
+            if member is None:
+                # They left without us noticing; drop them so the next draw can't pick them again.
+                print(f"Chosen user {user_id} not found in the guild, drawing again.")
+                self.stage((guild_id, user_id), None)
+                await self.flush()
 
-        eligible_users = [row[0] for row in rows]
-        chosen_user_id = random.choice(eligible_users)
-        member = channel.guild.get_member(chosen_user_id)
         if member is None:
-            print("Chosen user not found in the guild.")
+            if eligible:
+                print(f"No drawn user was in the guild after {attempts} attempts.")
+            else:
+                print("No eligible users after filtering for recent status changes.")
+            await self.record_draw(guild_id, drawn_at, None, None, eligible, attempts)
             return
 
         credits = random.randint(250, 850)
@@ -272,7 +556,109 @@ class CreditDropMonitor(commands.Cog):
             "Please open a ticket to claim your credits."
         )
         await channel.send(message)
+        await self.record_draw(guild_id, drawn_at, member.id, credits, eligible, attempts)
         print(f"Credit drop announcement sent to {member} for {credits} credits.")
 
+    async def draw_eligible(self, db, guild_id: int, cutoff: int):
+        """
+        Pick one of the guild's users uniformly at random from those who qualified at or before `cutoff`
+        without loading them all: count the range on idx_qualified_since, then step to a
+        random offset inside it. Both happen in one statement, so they see the same rows
+        even while flush_loop is writing. Returns (user_id, eligible_count); user_id is
+        None if nobody is eligible.
+        """
+        row = await db.fetchone(
+            """
+            WITH eligible (n) AS (
+                SELECT COUNT(*) FROM credit_drop WHERE guild_id = :guild_id AND qualified_since <= :cutoff
+            )
+            SELECT n, (
+                SELECT user_id FROM credit_drop WHERE guild_id = :guild_id AND qualified_since <= :cutoff
+                ORDER BY qualified_since LIMIT 1 OFFSET (SELECT abs(random()) % max(n, 1) FROM eligible)
+            ) FROM eligible
+            """,
+            {"guild_id": guild_id, "cutoff": cutoff}
+        )
+        eligible, user_id = row
+        return user_id, eligible
+
+    async def record_draw(self, guild_id, drawn_at, user_id, credits, eligible, attempts):
+        try:
+            await self.db.execute(
+                "INSERT INTO credit_drop_history (guild_id, drawn_at, user_id, credits, eligible, attempts) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (guild_id, drawn_at, user_id, credits, eligible, attempts)
+            )
+        except Exception as e:
+            print(f"Failed to record credit drop: {e}")
+
+    @commands.hybrid_command(name="creditdrop_bench")
+    @is_owner()
+    async def credit_drop_bench(self, ctx, rows: int = 1000000, draws: int = 200):
+        """
+        Dry-run the credit drop draw against a synthetic table and report draw latency.
+        """
+        path = "data/creditdrop_bench.db"
+        guild_id = 1
+        draws = max(1, draws)
+        await ctx.send(f"Building a synthetic credit_drop table with {rows} rows...")
+        started = time.perf_counter()
+        db = await database.connect(path, "monitor", MIGRATIONS)
+        try:
+            now = int(time.time())
+            batch = 100000
+            for start in range(0, rows, batch):
+                await db.executemany(
+                    "INSERT INTO credit_drop (guild_id, user_id, offline_since, qualified_since, last_status) "
+                    "VALUES (?, ?, NULL, ?, ?)",
+                    [(guild_id, user_id, now - random.randint(0, 60 * 24 * 60 * 60), "Zluqe.org | Free Bot Hosting")
+                     for user_id in range(start + 1, min(start + batch, rows) + 1)]
+                )
+                await asyncio.sleep(0)
+            build_time = time.perf_counter() - started
+
+            cutoff = now - QUALIFY_PERIOD
+            timings = []
+            eligible = 0
+            for _ in range(draws):
+                draw_started = time.perf_counter()
+                _, eligible = await self.draw_eligible(db, guild_id, cutoff)
+                timings.append((time.perf_counter() - draw_started) * 1000)
+        finally:
+            await database.release(db)
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+
+        timings.sort()
+        await ctx.send(
+            f"Built {rows} rows in {build_time:.1f}s, {eligible} eligible.\n"
+            f"{draws} draws: p50 {timings[len(timings) // 2]:.2f} ms, "
+            f"p95 {timings[int(len(timings) * 0.95) - 1]:.2f} ms, max {timings[-1]:.2f} ms"
+        )
+
+    @commands.hybrid_command(name="creditstats")
+    @is_owner()
+    async def credit_stats(self, ctx):
+        """
+        Show the credit drop monitor's write-behind counters.
+        """
+        stats = self.stats
+        hit_rate = 100 * stats['skipped'] / stats['events'] if stats['events'] else 0.0
+        await ctx.send(
+            f"Presence events: {stats['events']} "
+            f"({stats['skipped']} skipped, {stats['processed']} processed, {hit_rate:.1f}% fast path)\n"
+            f"Rows staged: {stats['rows_staged']}\n"
+            f"Rows written: {stats['rows_written']} in {stats['flushes']} flushes\n"
+            f"Pending: {len(self.pending)} | Tracked users: {len(self.rows)}\n"
+            f"Sweeps: {stats['sweeps']} ({stats['expired']} expired, {stats['vacuumed_pages']} pages vacuumed) | "
+            f"Purged on leave: {stats['purged']}"
+        )
+        for guild_id, r in self.last_reconcile.items():
+            await ctx.send(
+                f"Last reconcile of guild {guild_id}: {r['members']} members in {r['seconds']:.2f}s "
+                f"({r['inserted']} inserted, {r['updated']} updated, {r['deleted']} deleted)"
+            )
+
 async def setup(bot):
     await bot.add_cog(CreditDropMonitor(bot))
\ No newline at end of file
@@ -0,0 +1,37 @@
+import discord
+from discord.ext import commands
+from helpers.checks import is_owner
+from helpers.scheduler import get_scheduler
+
+class SchedulerCog(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.scheduler = get_scheduler(bot)
+
+    @commands.hybrid_command(name="jobs")
+    @is_owner()
+    async def jobs(self, ctx):
+        """
+        Show the scheduler's pending jobs and when it will next wake up.
+        """
+        scheduler = self.scheduler
+        next_wake = scheduler.next_wake()
+        embed = discord.Embed(title="Scheduled Jobs", color=discord.Color.blurple())
+        embed.add_field(name="Pending", value=str(len(scheduler.jobs)), inline=True)
+        embed.add_field(
+            name="Next Wake",
+            value=f"<t:{int(next_wake)}:R>" if next_wake is not None else "Nothing due",
+            inline=True
+        )
+        embed.add_field(name="Run / Failed", value=f"{scheduler.stats['run']} / {scheduler.stats['failed']}", inline=True)
+        upcoming = sorted(scheduler.jobs.items(), key=lambda item: item[1]["due"])[:10]
+        if upcoming:
+            embed.add_field(
+                name="Upcoming",
+                value="\n".join(f"`{name}` <t:{int(job['due'])}:R>" for name, job in upcoming),
+                inline=False
+            )
+        await ctx.send(embed=embed)
+
+async def setup(bot):
+    await bot.add_cog(SchedulerCog(bot))
@@ -3,6 +3,11 @@ from discord.ext import commands
 from typing import Optional
 from discord.ui import View, Button
 from discord import app_commands
+from helpers.scheduler import get_scheduler
+
+INACTIVITY_WARNING = 86400  # 24 hours without activity before the warning
+INACTIVITY_CLOSE = 43200  # 12 hours after the warning before closing
+RESOLVED_CLOSE = 86400  # resolved tickets close after 24 hours
 
 class OpenTicketButton(Button):
     def __init__(self, cog):
@@ -39,58 +44,105 @@ class Tickets(commands.Cog):
         self.ticket_data_file = "data/ticket.json"
         self.ticket_data = self.load_ticket_data()
         os.makedirs(self.transcript_dir, exist_ok=True)
-        # Create background task for checking inactive tickets
-        self.bg_task = self.bot.loop.create_task(self.check_inactive_tickets())
+        self.scheduler = get_scheduler(bot)
+        self.scheduler.register("ticket.inactive", self.warn_inactive_ticket)
+        self.scheduler.register("ticket.close", self.close_scheduled_ticket)
+
+    def schedule_inactivity(self, channel_id, last_activity: float):
+        """
+        (Re)arm the 24 hour inactivity warning for a ticket and drop any pending
+        inactivity close, since the ticket has seen activity.
+        """
+        self.scheduler.schedule(
+            f"ticket:{channel_id}:inactive", last_activity + INACTIVITY_WARNING,
+            "ticket.inactive", {"channel_id": int(channel_id)}
+        )
+        self.scheduler.cancel(f"ticket:{channel_id}:close")
+
+    def cancel_ticket_jobs(self, channel_id):
+        for job in ("inactive", "close", "resolved"):
+            self.scheduler.cancel(f"ticket:{channel_id}:{job}")
+
+    async def warn_inactive_ticket(self, name, payload):
+        channel_id = str(payload["channel_id"])
+        data = self.ticket_data.get(channel_id)
+        if not data or data.get('persist', False):
+            return
+        channel = self.bot.get_channel(int(channel_id))
+        if not channel or not isinstance(channel, discord.TextChannel):
+            del self.ticket_data[channel_id]
+            self.save_ticket_data()
+            return
+        user = self.bot.get_user(data.get('user_id'))
+        if user:
+            await channel.send(
+                f"{user.mention}, this ticket has been inactive for 24 hours. "
+                "It will be closed in 12 hours unless there is a response."
+            )
+        now = datetime.datetime.now().timestamp()
+        data['last_warning'] = now
+        self.save_ticket_data()
+        self.scheduler.schedule(
+            f"ticket:{channel_id}:close", now + INACTIVITY_CLOSE, "ticket.close", {"channel_id": int(channel_id)}
+        )
 
-    def cog_unload(self):
-        self.bg_task.cancel()
+    async def close_scheduled_ticket(self, name, payload):
+        channel_id = str(payload["channel_id"])
+        data = self.ticket_data.get(channel_id)
+        if not data or data.get('persist', False):
+            return
+        channel = self.bot.get_channel(int(channel_id))
+        if not channel:
+            del self.ticket_data[channel_id]
+            self.save_ticket_data()
+            return
+        await self.close_ticket(None, channel)
 
-    async def check_inactive_tickets(self):
-        await self.bot.wait_until_ready()
-        while not self.bot.is_closed():
+    async def schedule_untracked_tickets(self):
+        """
+        Make sure every open ticket has a pending inactivity job. Tickets from before
+        the scheduler (or whose jobs were lost) are armed from their last message.
+        """
+        for channel_id in list(self.ticket_data.keys()):
+            data = self.ticket_data.get(channel_id, {})
+            if data.get('persist', False):
+                continue
+            if any(self.scheduler.get(f"ticket:{channel_id}:{job}") for job in ("inactive", "close", "resolved")):
+                continue
+            channel = self.bot.get_channel(int(channel_id))
+            if not channel or not isinstance(channel, discord.TextChannel):
+                del self.ticket_data[channel_id]
+                self.save_ticket_data()
+                continue
+            if 'last_warning' in data:
+                self.scheduler.schedule(
+                    f"ticket:{channel_id}:close", data['last_warning'] + INACTIVITY_CLOSE,
+                    "ticket.close", {"channel_id": int(channel_id)}
+                )
+                continue
             try:
-                current_time = datetime.datetime.now().timestamp()
-                for channel_id in list(self.ticket_data.keys()):
-                    data = self.ticket_data.get(channel_id, {})
-                    if data.get('persist', False):
-                        continue
-                    channel = self.bot.get_channel(int(channel_id))
-                    if not channel or not isinstance(channel, discord.TextChannel):
-                        del self.ticket_data[channel_id]
-                        self.save_ticket_data()
-                        continue
-                    if not (channel.name.startswith('ticket-') or channel.name.startswith('resolved-')):
-                        continue
-                    try:
-                        messages = [message async for message in channel.history(limit=1)]
-                        if messages:
-                            last_activity = messages[0].created_at
-                        else:
-                            last_activity = channel.created_at
-                        time_since_activity = current_time - last_activity.timestamp()
-                        if time_since_activity >= 86400:  # 24 hours
-                            if 'last_warning' not in data:
-                                user = self.bot.get_user(data.get('user_id'))
-                                if user:
-                                    await channel.send(
-                                        f"{user.mention}, this ticket has been inactive for 24 hours. "
-                                        "It will be closed in 12 hours unless there is a response."
-                                    )
-                                data['last_warning'] = current_time
-                                self.save_ticket_data()
-                            else:
-                                if current_time - data['last_warning'] >= 43200:  # 12 hours
-                                    await self.close_ticket(None, channel)
-                        else:
-                            if 'last_warning' in data:
-                                del data['last_warning']
-                                self.save_ticket_data()
-                    except discord.Forbidden:
-                        continue
-                await asyncio.sleep(3600)  # Check every hour
-            except Exception as e:
-                print(f"Error in inactivity check: {e}")
-                await asyncio.sleep(60)
+                messages = [message async for message in channel.history(limit=1)]
+            except discord.Forbidden:
+                continue
+            last_activity = messages[0].created_at if messages else channel.created_at
+            self.schedule_inactivity(channel_id, last_activity.timestamp())
+
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        if message.author == self.bot.user:
+            return
+        channel_id = str(message.channel.id)
+        data = self.ticket_data.get(channel_id)
+        if not data or data.get('persist', False):
+            return
+        job = self.scheduler.get(f"ticket:{channel_id}:inactive")
+        now = message.created_at.timestamp()
+        # Only move the deadline once a minute so busy tickets don't rewrite the job file per message.
+        if job is None or now + INACTIVITY_WARNING - job["due"] >= 60:
+            self.schedule_inactivity(channel_id, now)
+        if 'last_warning' in data:
+            del data['last_warning']
+            self.save_ticket_data()
 
     def load_config(self):
         config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'config.yml')
@@ -169,31 +221,7 @@ class Tickets(commands.Cog):
             "persist": False
         }
         self.save_ticket_data()
-        self.bot.loop.create_task(self.track_ticket_activity(ticket_channel, user))
-
-    async def track_ticket_activity(self, channel: discord.TextChannel, user: discord.Member):
-        def check_response(message):
-            return message.channel == channel and message.author != self.bot.user
-        while self.ticket_data.get(str(channel.id), {}).get("persist") is False:
-            try:
-                await self.bot.wait_for('message', timeout=86400, check=check_response)
-                continue
-            except asyncio.TimeoutError:
-                await channel.send(
-                    f"{user.mention}, there has been no activity on this ticket for 24 hours. "
-                    "This ticket will be closed in 12 hours unless there is further response."
-                )
-                try:
-                    await self.bot.wait_for('message', timeout=43200, check=check_response)
-                    continue
-                except asyncio.TimeoutError:
-                    await self.close_ticket(None, channel)
-                    return
-
-    async def track_resolved_ticket(self, channel: discord.TextChannel):
-        await asyncio.sleep(86400)
-        if self.ticket_data.get(str(channel.id), {}).get("persist") is False:
-            await self.close_ticket(None, channel)
+        self.schedule_inactivity(ticket_channel.id, datetime.datetime.now().timestamp())
 
     @commands.hybrid_command(name='persist')
     @commands.has_permissions(manage_channels=True)
@@ -205,6 +233,7 @@ class Tickets(commands.Cog):
         if str(channel.id) in self.ticket_data:
             self.ticket_data[str(channel.id)]["persist"] = True
             self.save_ticket_data()
+            self.cancel_ticket_jobs(channel.id)
             await ctx.send("This ticket is now persisted and will not close automatically.")
         else:
             await ctx.send("This channel is not being tracked as a ticket.")
@@ -503,6 +532,7 @@ class Tickets(commands.Cog):
             os.remove(transcript)
         del self.ticket_data[str(channel.id)]
         self.save_ticket_data()
+        self.cancel_ticket_jobs(channel.id)
         try:
             await channel.delete(reason="Ticket closed automatically.")
         except discord.HTTPException:
@@ -535,7 +565,10 @@ class Tickets(commands.Cog):
         await channel.edit(name=resolved_name, reason=f"Ticket resolved by {ctx.author}")
         ticket_info["status"] = "resolved"
         self.save_ticket_data()
-        self.bot.loop.create_task(self.track_resolved_ticket(channel))
+        self.scheduler.schedule(
+            f"ticket:{channel.id}:resolved", datetime.datetime.now().timestamp() + RESOLVED_CLOSE,
+            "ticket.close", {"channel_id": channel.id}
+        )
 
     @commands.hybrid_command(name='close')
     @commands.has_permissions(manage_channels=True)
@@ -579,6 +612,7 @@ class Tickets(commands.Cog):
             os.remove(transcript_path)
         del self.ticket_data[str(channel.id)]
         self.save_ticket_data()
+        self.cancel_ticket_jobs(channel.id)
         try:
             await channel.delete(reason=f"Ticket closed by {ctx.author}")
         except discord.HTTPException:
@@ -590,6 +624,7 @@ class Tickets(commands.Cog):
         if embed_channel:
             view = TicketView(self)
             self.bot.add_view(view)
+        await self.schedule_untracked_tickets()
 
     @commands.command(name='setup_tickets')
     @commands.has_permissions(administrator=True)
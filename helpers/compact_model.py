@@ -0,0 +1,349 @@
+import hashlib, json, os, re, sys, time, unicodedata
+import numpy as np
+from helpers.moderation_model import current_rss, file_version, flagged_index, load_samples
+
+# Compact, memory-mapped form of the pickled moderation model.
+#
+# The pickled TfidfVectorizer keeps its vocabulary as a dict of Python strings,
+# which is slow to unpickle and costs far more memory than the text itself. The
+# converter writes the model to a directory instead:
+#
+#   meta.json           vectorizer settings, classifier kind, classes, source version
+#   terms.bin           every vocabulary term, UTF-8, back to back
+#   term_offsets.npy    uint64, where term i starts in terms.bin (plus the end)
+#   term_hashes.npy     uint64, 64-bit BLAKE2 hash of each term, sorted
+#   term_columns.npy    int32, feature column of each term
+#   idf.npy             float64 idf weights (TF-IDF vectorizers only)
+#   coef.npy, intercept.npy                 linear classifiers
+#   feature_log_prob.npy, class_log_prior.npy   multinomial naive Bayes
+#
+# The string table is ordered by term hash, so a whole batch's tokens are looked up
+# with one np.searchsorted and then checked against the stored bytes. Everything is
+# opened with mmap, so loading reads only meta.json and pages come in as they're used.
+# Scoring reimplements the vectorizer's analyzer and the classifier's predict_proba
+# and matches the pickled model to floating point rounding.
+#
+# Convert with:  python -m helpers.compact_model <vectorizer.pkl> <classifier.pkl> <output dir>
+
+FORMAT_VERSION = 1
+WHITE_SPACES = re.compile(r"\s\s+")
+
+def term_hash(term):
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+def strip_accents_unicode(text):
+    try:
+        text.encode("ASCII", errors="strict")
+        return text
+    except UnicodeEncodeError:
+        normalized = unicodedata.normalize("NFKD", text)
+        return "".join(c for c in normalized if not unicodedata.combining(c))
+
+def strip_accents_ascii(text):
+    return unicodedata.normalize("NFKD", text).encode("ASCII", "ignore").decode("ASCII")
+
+def build_analyzer(settings):
+    """The text -> features function of a CountVectorizer/TfidfVectorizer with these settings."""
+    accents = {None: None, "unicode": strip_accents_unicode, "ascii": strip_accents_ascii}[settings["strip_accents"]]
+    lowercase = settings["lowercase"]
+    min_n, max_n = settings["ngram_range"]
+
+    def preprocess(text):
+        if lowercase:
+            text = text.lower()
+        if accents is not None:
+            text = accents(text)
+        return text
+
+    if settings["analyzer"] == "word":
+        tokenize = re.compile(settings["token_pattern"]).findall
+        stop_words = frozenset(settings["stop_words"]) if settings["stop_words"] else None
+
+        def analyze(text):
+            tokens = tokenize(preprocess(text))
+            if stop_words is not None:
+                tokens = [w for w in tokens if w not in stop_words]
+            if max_n == 1:
+                return tokens
+            original = tokens
+            if min_n == 1:
+                tokens = list(original)
+                start = 2
+            else:
+                tokens = []
+                start = min_n
+            for n in range(start, min(max_n + 1, len(original) + 1)):
+                for i in range(len(original) - n + 1):
+                    tokens.append(" ".join(original[i:i + n]))
+            return tokens
+
+    elif settings["analyzer"] == "char":
+        def analyze(text):
+            text = WHITE_SPACES.sub(" ", preprocess(text))
+            text_len = len(text)
+            if min_n == 1:
+                ngrams = list(text)
+                start = 2
+            else:
+                ngrams = []
+                start = min_n
+            for n in range(start, min(max_n + 1, text_len + 1)):
+                for i in range(text_len - n + 1):
+                    ngrams.append(text[i:i + n])
+            return ngrams
+
+    elif settings["analyzer"] == "char_wb":
+        def analyze(text):
+            text = WHITE_SPACES.sub(" ", preprocess(text))
+            ngrams = []
+            for w in text.split():
+                w = " " + w + " "
+                w_len = len(w)
+                for n in range(min_n, max_n + 1):
+                    offset = 0
+                    ngrams.append(w[offset:offset + n])
+                    while offset + n < w_len:
+                        offset += 1
+                        ngrams.append(w[offset:offset + n])
+                    if offset == 0:
+                        break
+            return ngrams
+
+    else:
+        raise ValueError(f"unsupported analyzer {settings['analyzer']!r}")
+    return analyze
+
+def vectorizer_settings(vectorizer):
+    """The parts of a fitted vectorizer the compact model needs, as JSON-able values."""
+    if callable(vectorizer.analyzer) or vectorizer.preprocessor is not None or vectorizer.tokenizer is not None:
+        raise ValueError("custom analyzers, preprocessors and tokenizers can't be converted")
+    if getattr(vectorizer, "input", "content") != "content":
+        raise ValueError("only input='content' vectorizers can be converted")
+    if callable(vectorizer.strip_accents):
+        raise ValueError("custom strip_accents functions can't be converted")
+    stop_words = vectorizer.get_stop_words() if vectorizer.analyzer == "word" else None
+    idf = getattr(vectorizer, "idf_", None) if getattr(vectorizer, "use_idf", False) else None
+    return {
+        "analyzer": vectorizer.analyzer,
+        "lowercase": bool(vectorizer.lowercase),
+        "strip_accents": vectorizer.strip_accents,
+        "token_pattern": vectorizer.token_pattern,
+        "ngram_range": list(vectorizer.ngram_range),
+        "stop_words": sorted(stop_words) if stop_words else None,
+        "binary": bool(vectorizer.binary),
+        "sublinear_tf": bool(getattr(vectorizer, "sublinear_tf", False)),
+        "norm": getattr(vectorizer, "norm", None),
+        "use_idf": idf is not None,
+    }, idf
+
+def classifier_arrays(classifier):
+    """(kind, extra meta, {file name: array}) for a supported fitted classifier."""
+    name = type(classifier).__name__
+    classes = list(classifier.classes_)
+    if name == "MultinomialNB":
+        return "naive_bayes", {}, {
+            "feature_log_prob": classifier.feature_log_prob_,
+            "class_log_prior": classifier.class_log_prior_,
+        }
+    if name in ("LogisticRegression", "SGDClassifier"):
+        if name == "SGDClassifier" and classifier.loss not in ("log_loss", "log"):
+            raise ValueError("only SGDClassifier(loss='log_loss') has predict_proba")
+        multi_class = getattr(classifier, "multi_class", "auto")
+        ovr = name == "SGDClassifier" or multi_class == "ovr" or (
+            multi_class == "auto" and getattr(classifier, "solver", None) == "liblinear"
+        )
+        return "linear", {"multiclass": "ovr" if ovr and len(classes) > 2 else "softmax"}, {
+            "coef": classifier.coef_,
+            "intercept": np.asarray(classifier.intercept_, dtype=np.float64),
+        }
+    raise ValueError(f"unsupported classifier {name}")
+
+def convert(vectorizer, classifier, directory, version=None):
+    """Write a fitted vectorizer/classifier pair to `directory` in the compact format."""
+    settings, idf = vectorizer_settings(vectorizer)
+    kind, classifier_meta, arrays = classifier_arrays(classifier)
+    os.makedirs(directory, exist_ok=True)
+
+    terms = sorted(vectorizer.vocabulary_.items(), key=lambda item: term_hash(item[0]))
+    encoded = [term.encode("utf-8") for term, _ in terms]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    np.cumsum([len(term) for term in encoded], out=offsets[1:])
+    with open(os.path.join(directory, "terms.bin"), "wb") as f:
+        for term in encoded:
+            f.write(term)
+    np.save(os.path.join(directory, "term_offsets.npy"), offsets)
+    np.save(os.path.join(directory, "term_hashes.npy"), np.array([term_hash(t) for t, _ in terms], dtype=np.uint64))
+    np.save(os.path.join(directory, "term_columns.npy"), np.array([c for _, c in terms], dtype=np.int32))
+    if idf is not None:
+        np.save(os.path.join(directory, "idf.npy"), np.asarray(idf, dtype=np.float64))
+    for name, array in arrays.items():
+        np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(array, dtype=np.float64))
+
+    classes = [c.item() if hasattr(c, "item") else c for c in classifier.classes_]
+    meta = {
+        "format": FORMAT_VERSION,
+        "version": version,
+        "vectorizer": settings,
+        "n_features": len(vectorizer.vocabulary_),
+        "classifier": kind,
+        "classes": classes,
+        **classifier_meta,
+    }
+    with open(os.path.join(directory, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=4)
+
+class CompactModel:
+    kind = "compact"
+
+    def __init__(self, directory):
+        with open(os.path.join(directory, "meta.json"), "r") as f:
+            meta = json.load(f)
+        if meta["format"] != FORMAT_VERSION:
+            raise ValueError(f"unsupported compact model format {meta['format']}")
+        self.meta = meta
+        self.version = meta["version"] or os.path.basename(os.path.normpath(directory))
+        self.settings = meta["vectorizer"]
+        self.analyze = build_analyzer(self.settings)
+        self.flagged_idx = flagged_index(meta["classes"])
+        self.load_seconds = 0.0
+        self.memory_bytes = 0
+
+        def array(name):
+            path = os.path.join(directory, f"{name}.npy")
+            return np.load(path, mmap_mode="r") if os.path.exists(path) else None
+
+        self.terms = np.memmap(os.path.join(directory, "terms.bin"), dtype=np.uint8, mode="r") \
+            if os.path.getsize(os.path.join(directory, "terms.bin")) else np.zeros(0, dtype=np.uint8)
+        self.term_offsets = array("term_offsets")
+        self.term_hashes = array("term_hashes")
+        self.term_columns = array("term_columns")
+        self.idf = array("idf")
+        if meta["classifier"] == "linear":
+            self.weights = array("coef")
+            self.bias = array("intercept")
+        else:
+            self.weights = array("feature_log_prob")
+            self.bias = array("class_log_prior")
+
+    def lookup(self, tokens):
+        """Feature column of each token, -1 for tokens outside the vocabulary."""
+        hashes = np.fromiter((term_hash(token) for token in tokens), dtype=np.uint64, count=len(tokens))
+        positions = np.searchsorted(self.term_hashes, hashes)
+        columns = np.full(len(tokens), -1, dtype=np.int64)
+        size = len(self.term_hashes)
+        for i, (token, position) in enumerate(zip(tokens, positions.tolist())):
+            encoded = token.encode("utf-8")
+            # Equal hashes sit next to each other; compare the stored bytes to rule out collisions.
+            while position < size and self.term_hashes[position] == hashes[i]:
+                start, end = int(self.term_offsets[position]), int(self.term_offsets[position + 1])
+                if self.terms[start:end].tobytes() == encoded:
+                    columns[i] = self.term_columns[position]
+                    break
+                position += 1
+        return columns
+
+    def transform(self, texts):
+        """Sparse document-term rows as (row, column, value) arrays, like the vectorizer's transform."""
+        counts = []
+        vocabulary = {}
+        for text in texts:
+            doc = {}
+            for feature in self.analyze(text):
+                doc[feature] = doc.get(feature, 0) + 1
+            counts.append(doc)
+            for feature in doc:
+                vocabulary.setdefault(feature, len(vocabulary))
+        tokens = list(vocabulary)
+        columns = self.lookup(tokens) if tokens else np.zeros(0, dtype=np.int64)
+
+        rows, cols, values = [], [], []
+        for row, doc in enumerate(counts):
+            for feature, count in doc.items():
+                column = columns[vocabulary[feature]]
+                if column >= 0:
+                    rows.append(row)
+                    cols.append(column)
+                    values.append(count)
+        rows = np.array(rows, dtype=np.int64)
+        cols = np.array(cols, dtype=np.int64)
+        values = np.array(values, dtype=np.float64)
+
+        settings = self.settings
+        if settings["binary"]:
+            values[:] = 1.0
+        if settings["sublinear_tf"]:
+            values = np.log(values) + 1
+        if settings["use_idf"]:
+            values = values * self.idf[cols]
+        if settings["norm"] == "l2":
+            norms = np.sqrt(np.bincount(rows, weights=values * values, minlength=len(texts)))
+        elif settings["norm"] == "l1":
+            norms = np.bincount(rows, weights=np.abs(values), minlength=len(texts))
+        else:
+            norms = None
+        if norms is not None:
+            norms[norms == 0] = 1.0
+            values = values / norms[rows]
+        return rows, cols, values
+
+    def predict_proba(self, texts):
+        rows, cols, values = self.transform(texts)
+        weights = self.weights
+        scores = np.zeros((len(texts), weights.shape[0]), dtype=np.float64)
+        if len(rows):
+            np.add.at(scores, rows, (weights[:, cols] * values).T)
+        scores += self.bias
+
+        if self.meta["classifier"] == "naive_bayes":
+            scores -= scores.max(axis=1, keepdims=True)
+            probabilities = np.exp(scores)
+            return probabilities / probabilities.sum(axis=1, keepdims=True)
+        if scores.shape[1] == 1:
+            positive = 1.0 / (1.0 + np.exp(-scores[:, 0]))
+            return np.column_stack([1.0 - positive, positive])
+        if self.meta["multiclass"] == "ovr":
+            probabilities = 1.0 / (1.0 + np.exp(-scores))
+            return probabilities / probabilities.sum(axis=1, keepdims=True)
+        scores -= scores.max(axis=1, keepdims=True)
+        probabilities = np.exp(scores)
+        return probabilities / probabilities.sum(axis=1, keepdims=True)
+
+    def predict(self, texts):
+        return [float(p) for p in self.predict_proba(texts)[:, self.flagged_idx]]
+
+def load_compact(directory, version=None):
+    """Open a compact model, recording how long it took and how much memory it added."""
+    started = time.perf_counter()
+    rss_before = current_rss()
+    model = CompactModel(directory)
+    if version is not None:
+        model.version = version
+    model.load_seconds = time.perf_counter() - started
+    model.memory_bytes = max(0, current_rss() - rss_before)
+    return model
+
+def main(argv):
+    if len(argv) != 3:
+        print("Usage: python -m helpers.compact_model <vectorizer.pkl> <classifier.pkl> <output dir>")
+        return 2
+    from helpers.moderation_model import load_pickled
+    vectorizer_path, classifier_path, directory = argv
+    pickled = load_pickled(vectorizer_path, classifier_path)
+    convert(pickled.vectorizer, pickled.classifier, directory, file_version(vectorizer_path, classifier_path))
+    compact = load_compact(directory)
+
+    texts = [sample["text"] for sample in load_samples()] or [
+        "hello there", "thanks for the help!", "you are an idiot", "free nitro at this link", "",
+    ]
+    expected = pickled.predict(texts)
+    actual = compact.predict(texts)
+    difference = max(abs(a - b) for a, b in zip(expected, actual))
+    size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+    print(f"Wrote {directory} ({size / 1e6:.1f} MB on disk, {compact.meta['n_features']} features).")
+    print(f"Pickle load: {pickled.load_seconds:.3f}s, ~{pickled.memory_bytes / 1e6:.1f} MB")
+    print(f"Compact load: {compact.load_seconds:.3f}s, ~{compact.memory_bytes / 1e6:.1f} MB")
+    print(f"Largest probability difference over {len(texts)} texts: {difference:.2e}")
+    return 0 if difference < 1e-9 else 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
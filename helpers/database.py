@@ -0,0 +1,264 @@
+import asyncio, os
+import aiosqlite
+
+# Shared async SQLite access for the cogs.
+#
+# Every database file gets one Database object no matter how many cogs use it.
+# Writes go through a single writer connection fed by a queue: whatever is queued
+# while the previous commit is running gets grouped into the next transaction, so
+# a burst of writes costs one fsync instead of one each. Reads use their own
+# connections so they never wait behind the writer (WAL keeps them consistent).
+
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -16000",  # ~16 MB page cache
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA busy_timeout = 5000",
+)
+READERS = 2  # read connections per database file
+MAX_BATCH = 256  # most queued writes committed in one transaction
+
+_databases = {}
+_lock = asyncio.Lock()
+
+class Database:
+    def __init__(self, path):
+        self.path = path
+        self.writer = None
+        self.readers = []
+        self.queue = asyncio.Queue()
+        self.writer_task = None
+        self.users = 0
+        self._next_reader = 0
+        self.stats = {"writes": 0, "commits": 0, "failed": 0}
+
+    async def open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.writer = await aiosqlite.connect(self.path, isolation_level=None)
+        for pragma in PRAGMAS:
+            await self.writer.execute(pragma)
+        await self.writer.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                name TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                PRIMARY KEY (name, version)
+            )
+        """)
+        for _ in range(READERS):
+            reader = await aiosqlite.connect(self.path, isolation_level=None)
+            for pragma in PRAGMAS[1:]:
+                await reader.execute(pragma)
+            self.readers.append(reader)
+        self.writer_task = asyncio.create_task(self._write_loop())
+
+    async def close(self):
+        """Commit whatever is still queued, then close every connection."""
+        if self.writer_task is not None:
+            await self.queue.put(None)
+            await self.writer_task
+            self.writer_task = None
+        for reader in self.readers:
+            await reader.close()
+        self.readers = []
+        if self.writer is not None:
+            await self.writer.close()
+            self.writer = None
+
+    async def migrate(self, name, migrations):
+        """
+        Apply the migrations for `name` that haven't been applied yet.
+        `migrations` is a list of tuples of SQL statements; migration N (1-based) is
+        applied once, in its own savepoint, together with its schema_migrations row.
+        """
+        rows = await self.fetchall("SELECT version FROM schema_migrations WHERE name = ?", (name,))
+        applied = {row[0] for row in rows}
+        for version, statements in enumerate(migrations, start=1):
+            if version in applied:
+                continue
+
+            async def apply(conn, statements=statements, version=version):
+                for statement in statements:
+                    await conn.execute(statement)
+                await conn.execute(
+                    "INSERT INTO schema_migrations (name, version) VALUES (?, ?)", (name, version)
+                )
+
+            await self.write(apply)
+            print(f"Applied {name} migration {version} to {self.path}.")
+
+    def _reader(self):
+        reader = self.readers[self._next_reader]
+        self._next_reader = (self._next_reader + 1) % len(self.readers)
+        return reader
+
+    async def fetchone(self, sql, params=()):
+        async with self._reader().execute(sql, params) as cursor:
+            return await cursor.fetchone()
+
+    async def fetchall(self, sql, params=()):
+        async with self._reader().execute(sql, params) as cursor:
+            return await cursor.fetchall()
+
+    async def write(self, fn, transaction=True):
+        """
+        Queue `fn(conn)` to run on the writer connection and wait until the
+        transaction it ended up in has been committed. Returns whatever `fn` returned.
+        If `fn` raises, only its own changes are rolled back and the error is re-raised here.
+        With transaction=False `fn` runs on its own outside any transaction, which
+        statements like VACUUM need.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((fn, future, transaction))
+        return await future
+
+    async def execute(self, sql, params=()):
+        async def run(conn):
+            cursor = await conn.execute(sql, params)
+            return cursor.rowcount
+        return await self.write(run)
+
+    async def executemany(self, sql, seq_of_params):
+        async def run(conn):
+            cursor = await conn.executemany(sql, seq_of_params)
+            return cursor.rowcount
+        return await self.write(run)
+
+    async def enable_incremental_vacuum(self):
+        """
+        Switch the file to auto_vacuum=INCREMENTAL so incremental_vacuum() can hand
+        free pages back. Changing the mode needs a one-off full VACUUM.
+        """
+        async def run(conn):
+            async with conn.execute("PRAGMA auto_vacuum") as cursor:
+                if (await cursor.fetchone())[0] == 2:
+                    return False
+            await conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            await conn.execute("VACUUM")
+            return True
+
+        if await self.write(run, transaction=False):
+            print(f"Enabled incremental vacuum on {self.path}.")
+
+    async def incremental_vacuum(self, pages=None):
+        """
+        Release up to `pages` free pages (all of them if None) back to the filesystem.
+        Returns the number of pages released.
+        """
+        async def run(conn):
+            async with conn.execute("PRAGMA freelist_count") as cursor:
+                before = (await cursor.fetchone())[0]
+            # The pragma frees one page per step and execute() only steps once,
+            # so run it as a script, which steps it to completion.
+            pragma = "PRAGMA incremental_vacuum" if pages is None else f"PRAGMA incremental_vacuum({int(pages)})"
+            await conn.executescript(pragma + ";")
+            async with conn.execute("PRAGMA freelist_count") as cursor:
+                after = (await cursor.fetchone())[0]
+            return before - after
+
+        return await self.write(run, transaction=False)
+
+    async def _write_loop(self):
+        closing = False
+        while not closing:
+            job = await self.queue.get()
+            batch = []
+            if job is None:
+                closing = True
+            else:
+                batch.append(job)
+            while not self.queue.empty() and len(batch) < MAX_BATCH:
+                job = self.queue.get_nowait()
+                if job is None:
+                    closing = True
+                else:
+                    batch.append(job)
+            segment = []
+            for fn, future, transaction in batch:
+                if transaction:
+                    segment.append((fn, future))
+                    continue
+                if segment:
+                    await self._run_batch(segment)
+                    segment = []
+                await self._run_alone(fn, future)
+            if segment:
+                await self._run_batch(segment)
+
+    async def _run_alone(self, fn, future):
+        try:
+            result = await fn(self.writer)
+        except Exception as e:
+            self.stats["failed"] += 1
+            if not future.done():
+                future.set_exception(e)
+        else:
+            self.stats["writes"] += 1
+            if not future.done():
+                future.set_result(result)
+
+    async def _run_batch(self, batch):
+        results = []
+        try:
+            await self.writer.execute("BEGIN IMMEDIATE")
+            for fn, future in batch:
+                await self.writer.execute("SAVEPOINT job")
+                try:
+                    result = await fn(self.writer)
+                except Exception as e:
+                    await self.writer.execute("ROLLBACK TO job")
+                    await self.writer.execute("RELEASE job")
+                    results.append((future, None, e))
+                else:
+                    await self.writer.execute("RELEASE job")
+                    results.append((future, result, None))
+            await self.writer.execute("COMMIT")
+        except Exception as e:
+            try:
+                await self.writer.execute("ROLLBACK")
+            except Exception:
+                pass
+            self.stats["failed"] += len(batch)
+            print(f"Failed to commit write batch to {self.path}: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.stats["writes"] += len(batch)
+        self.stats["commits"] += 1
+        for future, result, error in results:
+            if future.done():
+                continue
+            if error is not None:
+                self.stats["failed"] += 1
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+async def connect(path, name, migrations=()):
+    """
+    Get the shared Database for `path`, opening it on first use, and apply
+    the caller's migrations. Every connect() should be paired with release().
+    """
+    key = os.path.abspath(path)
+    async with _lock:
+        db = _databases.get(key)
+        if db is None:
+            db = Database(path)
+            await db.open()
+            _databases[key] = db
+        db.users += 1
+    await db.migrate(name, migrations)
+    return db
+
+async def release(db):
+    """Drop a handle from connect(); the file is closed once nobody uses it."""
+    async with _lock:
+        db.users -= 1
+        if db.users > 0:
+            return
+        _databases.pop(os.path.abspath(db.path), None)
+    await db.close()
@@ -0,0 +1,191 @@
+import asyncio, hashlib, time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Micro-batched model inference off the event loop.
+#
+# score() queues one input and returns its result through a future. A single
+# worker task takes whatever is queued, waits up to `max_delay` seconds for the
+# batch to fill to `max_batch`, and runs `predict(inputs) -> outputs` once for
+# the whole batch in a worker thread, so the event loop never runs the model
+# and vectorized libraries see one matrix instead of many single rows.
+#
+# ResultCache sits in front of it for inputs that repeat (spam, raids, copypasta):
+# results are kept per content hash in a bounded LRU, and identical requests that
+# arrive while the first is still being scored share its future.
+
+LATENCY_SAMPLES = 1000  # most recent request latencies kept for percentiles
+
+class BatchInference:
+    def __init__(self, predict, max_batch=32, max_delay=0.01, workers=1):
+        self.predict = predict
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inference")
+        self.queue = asyncio.Queue()
+        self.task = None
+        self.batch = []  # requests the worker has taken off the queue and not yet answered
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.stats = {"requests": 0, "batches": 0, "failed": 0, "largest_batch": 0}
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Stop the worker and cancel every request still waiting, including the batch being scored."""
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        pending = self.batch
+        self.batch = []
+        while not self.queue.empty():
+            pending.append(self.queue.get_nowait())
+        for _, future, _ in pending:
+            if not future.done():
+                future.cancel()
+        self.executor.shutdown(wait=False)
+
+    async def score(self, item):
+        """Queue `item` for the next batch and wait for its result."""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((item, future, time.perf_counter()))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self.batch = batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                if not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            items = [item for item, _, _ in batch]
+            try:
+                results = await loop.run_in_executor(self.executor, self.predict, items)
+            except Exception as e:
+                self.stats["failed"] += len(batch)
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                self.batch = []
+                continue
+
+            now = time.perf_counter()
+            self.stats["requests"] += len(batch)
+            self.stats["batches"] += 1
+            self.stats["largest_batch"] = max(self.stats["largest_batch"], len(batch))
+            for (_, future, queued_at), result in zip(batch, results):
+                self.latencies.append(now - queued_at)
+                if not future.done():
+                    future.set_result(result)
+            self.batch = []
+
+    def percentile(self, fraction):
+        """Request latency (seconds, queueing included) at `fraction` of the recent samples."""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+    def snapshot(self):
+        """Counters plus queue depth, mean batch size and p50/p99 latency in ms."""
+        batches = self.stats["batches"]
+        return {
+            **self.stats,
+            "queue_depth": self.queue.qsize(),
+            "mean_batch": self.stats["requests"] / batches if batches else 0.0,
+            "p50_ms": self.percentile(0.50) * 1000,
+            "p99_ms": self.percentile(0.99) * 1000,
+        }
+
+def content_key(text):
+    """Compact cache key for a piece of text."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+class ResultCache:
+    def __init__(self, max_entries=10000, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl  # seconds an entry stays valid, or None to keep it until evicted
+        self.entries = OrderedDict()  # key -> (result, stored at)
+        self.inflight = {}  # key -> future of the computation in progress
+        self.generation = 0  # bumped by clear() so results computed before it aren't stored
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+    def get(self, key):
+        """Return (True, result) for a live entry, else (False, None)."""
+        entry = self.entries.get(key)
+        if entry is None:
+            return False, None
+        result, stored_at = entry
+        if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+            del self.entries[key]
+            self.stats["expired"] += 1
+            return False, None
+        self.entries.move_to_end(key)
+        return True, result
+
+    def put(self, key, result):
+        self.entries[key] = (result, time.monotonic())
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def clear(self):
+        """Forget every result, e.g. after the model changes."""
+        self.entries.clear()
+        self.inflight.clear()
+        self.generation += 1
+
+    async def get_or_compute(self, key, compute):
+        """Cached result for `key`, or the result of awaiting `compute()` (shared by concurrent callers)."""
+        found, result = self.get(key)
+        if found:
+            self.stats["hits"] += 1
+            return result
+        pending = self.inflight.get(key)
+        if pending is not None:
+            self.stats["hits"] += 1
+            return await asyncio.shield(pending)
+        self.stats["misses"] += 1
+        generation = self.generation
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        try:
+            result = await compute()
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                e = RuntimeError("the request being waited on was cancelled")
+            future.set_exception(e)
+            future.exception()  # retrieved here so a future nobody shares doesn't warn
+            raise
+        finally:
+            if self.inflight.get(key) is future:
+                del self.inflight[key]
+        future.set_result(result)
+        if generation == self.generation:
+            self.put(key, result)
+        return result
+
+    def snapshot(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "size": len(self.entries),
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,126 @@
+import hashlib, json, os, pickle, resource, time
+
+# Moderation classifier wrappers.
+#
+# A model object bundles everything needed to score text and is never changed
+# after it is built, so the cog can swap models by replacing one reference while
+# batches are in flight. Every model exposes predict(texts) -> [flagged probability]
+# plus its version, load time and approximate memory footprint.
+# Loading (pickle.load and friends) is blocking and meant to run in a worker thread.
+
+SAMPLES_PATH = "data/moderation_samples.json"
+COMPACT_DIRNAME = "moderation_compact"  # compact copy of the model next to the pickles (helpers/compact_model.py)
+VECTORIZER_FILENAME = "moderation_vectorizer.pkl"
+CLASSIFIER_FILENAME = "moderation_classifier.pkl"
+ONLINE_CHECKPOINT = "online_model.pkl"  # checkpoint of the online model (helpers/online_model.py)
+MIN_SAMPLE_ACCURACY = 0.8  # share of samples a new model has to get right to be swapped in
+
+def current_rss():
+    """Resident memory of this process in bytes."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # Peak rather than current outside Linux, still fine for a before/after estimate.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def file_version(*paths):
+    """Short content hash of the model files, used as the version when none is given."""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+def flagged_index(classes):
+    """Column of predict_proba holding the FLAGGED probability."""
+    for idx, cls_label in enumerate(classes):
+        if cls_label == "FLAGGED":
+            return idx
+    return 1
+
+class PickledModel:
+    """The scikit-learn vectorizer/classifier pair pickled in data/."""
+    kind = "pickle"
+
+    def __init__(self, vectorizer, classifier, version):
+        self.vectorizer = vectorizer
+        self.classifier = classifier
+        self.flagged_idx = flagged_index(classifier.classes_)
+        self.version = version
+        self.load_seconds = 0.0
+        self.memory_bytes = 0
+
+    def predict(self, texts):
+        X = self.vectorizer.transform(texts)
+        return [float(p) for p in self.classifier.predict_proba(X)[:, self.flagged_idx]]
+
+def load_pickled(vectorizer_path, classifier_path, version=None):
+    """Unpickle a model, recording how long it took and how much memory it added."""
+    started = time.perf_counter()
+    rss_before = current_rss()
+    with open(vectorizer_path, "rb") as vf:
+        vectorizer = pickle.load(vf)
+    with open(classifier_path, "rb") as cf:
+        classifier = pickle.load(cf)
+    model = PickledModel(vectorizer, classifier, version or file_version(vectorizer_path, classifier_path))
+    model.load_seconds = time.perf_counter() - started
+    model.memory_bytes = max(0, current_rss() - rss_before)
+    return model
+
+def has_model(directory):
+    """Whether `directory` holds an online checkpoint, a compact model or the pickled pair."""
+    return os.path.exists(os.path.join(directory, ONLINE_CHECKPOINT)) or os.path.exists(
+        os.path.join(directory, COMPACT_DIRNAME, "meta.json")
+    ) or (
+        os.path.exists(os.path.join(directory, VECTORIZER_FILENAME))
+        and os.path.exists(os.path.join(directory, CLASSIFIER_FILENAME))
+    )
+
+def load_model_dir(directory, version=None):
+    """
+    Load the model in `directory`: the online model's checkpoint if there is one,
+    otherwise the compact copy, otherwise the pickles.
+    """
+    if os.path.exists(os.path.join(directory, ONLINE_CHECKPOINT)):
+        from helpers.online_model import load_online
+        return load_online(directory, version)
+    compact_dir = os.path.join(directory, COMPACT_DIRNAME)
+    if os.path.exists(os.path.join(compact_dir, "meta.json")):
+        from helpers.compact_model import load_compact  # needs numpy, which only the compact format uses directly
+        return load_compact(compact_dir, version)
+    return load_pickled(
+        os.path.join(directory, VECTORIZER_FILENAME), os.path.join(directory, CLASSIFIER_FILENAME), version
+    )
+
+def load_samples(path=SAMPLES_PATH):
+    """
+    Labelled sample messages for validating a model before it goes live: a JSON list
+    of {"text": ..., "flagged": true/false}. An empty list if the file doesn't exist.
+    """
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+def validate(model, samples, threshold):
+    """
+    Score `samples` with `model`. Returns (ok, summary). Without samples the model
+    only has to return a probability in [0, 1] for a couple of throwaway texts,
+    except online models, which are always refused without samples.
+    """
+    if not samples and model.kind == "online":
+        # Trained only on moderator labels, so there's nothing else vouching for it.
+        return False, f"online models need labelled samples at {SAMPLES_PATH} before they can go live"
+    texts = [sample["text"] for sample in samples] or ["hello there", "thanks for the help"]
+    probabilities = model.predict(texts)
+    if len(probabilities) != len(texts) or not all(0.0 <= p <= 1.0 for p in probabilities):
+        return False, "returned invalid probabilities"
+    if not samples:
+        return True, f"no samples at {SAMPLES_PATH}, smoke test passed"
+    correct = sum((p >= threshold) == bool(sample["flagged"]) for sample, p in zip(samples, probabilities))
+    accuracy = correct / len(samples)
+    summary = f"{correct}/{len(samples)} samples correct ({accuracy:.0%})"
+    return accuracy >= MIN_SAMPLE_ACCURACY, summary
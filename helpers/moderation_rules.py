@@ -0,0 +1,156 @@
+import ipaddress, os, re, time
+from collections import namedtuple
+
+# Message scanning pipeline for the Moderation cog.
+#
+# A pipeline is a list of rules run cheapest first. Each rule looks at a ScanContext
+# and either returns None (no opinion, keep going) or a Verdict, which ends the scan:
+# "delete" and "flag" are acted on by the cog, "allow" just stops the remaining rules.
+# Every rule keeps its own counters so /modstats can show where the time goes.
+
+Verdict = namedtuple("Verdict", "action rule reason score")
+
+class ScanContext:
+    """One message on its way through the pipeline; rules may leave results here for later rules."""
+    def __init__(self, message):
+        self.message = message
+        self.content = message.content.strip()
+        self.processed = None  # content after the word filter
+
+    @property
+    def scorable(self):
+        """Whether the classifier looks at this message at all."""
+        message = self.message
+        return not message.author.bot and not message.mentions and len(self.content) > 2
+
+class Rule:
+    """Shared counters and Verdict helper; subclasses define `async def check(self, ctx)`."""
+    name = "rule"
+    cost = 0  # relative cost; cheaper rules run first
+
+    def __init__(self):
+        self.checked = 0
+        self.hits = 0
+        self.seconds = 0.0
+
+    def verdict(self, action, reason, score=None):
+        return Verdict(action, self.name, reason, score)
+
+class ExtensionRule(Rule):
+    """Deletes messages with an attachment whose extension is on the list."""
+    name = "extension"
+    cost = 1
+
+    def __init__(self, extensions):
+        super().__init__()
+        self.extensions = frozenset(extension.lower() for extension in extensions)
+
+    async def check(self, ctx):
+        for attachment in ctx.message.attachments:
+            if os.path.splitext(attachment.filename.lower())[1] in self.extensions:
+                return self.verdict("delete", "an attachment with a prohibited file extension")
+        return None
+
+# Dotted quads with every octet in 0-255.
+IPV4_PATTERN = re.compile(
+    r'(?<![\d.])(?:(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)\.){3}(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)(?!\.?\d)'
+)
+# Runs of hex digits and colons with at least two colons; ipaddress decides if they're IPv6.
+IPV6_CANDIDATE = re.compile(r'(?<![\w:])(?=[0-9a-f.]*:[0-9a-f.]*:)[0-9a-f:.]*[0-9a-f][0-9a-f:.]*(?![\w:])', re.IGNORECASE)
+# Fewest hex groups a compressed IPv6 candidate needs before it counts as an address.
+# Short forms like "Rule 1:: be nice", "ratio 3::2", "a::b" and "dead::beef" parse as
+# IPv6 but are ordinary chat, so they are left alone.
+IPV6_MIN_GROUPS = 3
+
+def is_ipv6_address(candidate):
+    """Whether `candidate` is an IPv6 address someone actually wrote, not a short form that only parses as one."""
+    candidate = candidate.rstrip(".")
+    try:
+        ipaddress.IPv6Address(candidate)
+    except ValueError:
+        return False
+    if "." in candidate:
+        return True  # embedded IPv4 tail
+    groups = [group for group in candidate.split(":") if group]
+    if "::" not in candidate:
+        return len(groups) == 8
+    return len(groups) >= IPV6_MIN_GROUPS
+
+class IPAddressRule(Rule):
+    """Deletes messages containing an IPv4 or IPv6 address."""
+    name = "ip_address"
+    cost = 2
+
+    async def check(self, ctx):
+        content = ctx.content
+        if "." in content and IPV4_PATTERN.search(content):
+            return self.verdict("delete", "an IP address")
+        if "::" in content or content.count(":") >= 7:
+            for candidate in IPV6_CANDIDATE.findall(content):
+                if is_ipv6_address(candidate):
+                    return self.verdict("delete", "an IP address")
+        return None
+
+class WordFilterRule(Rule):
+    """
+    Strips the remove list from messages the classifier will score. Ends the scan
+    when the message isn't scorable or nothing is left to score.
+    """
+    name = "word_filter"
+    cost = 3
+
+    def __init__(self, word_filter):
+        super().__init__()
+        self.filter = word_filter  # a helpers.wordfilter.WordFilter, replaced as a whole on reload
+
+    async def check(self, ctx):
+        if not ctx.scorable:
+            return self.verdict("allow", "not scored")
+        ctx.processed = self.filter.sub('', ctx.content).strip()
+        if not ctx.processed:
+            return self.verdict("allow", "nothing left to score")
+        return None
+
+class ClassifierRule(Rule):
+    """Flags messages the classifier scores at or above the threshold."""
+    name = "classifier"
+    cost = 10
+
+    def __init__(self, score, threshold):
+        super().__init__()
+        self.score = score  # coroutine: processed text -> flagged probability, or None
+        self.threshold = threshold
+
+    async def check(self, ctx):
+        if ctx.processed is None:
+            return None
+        probability = await self.score(ctx.processed)
+        if probability is not None and probability >= self.threshold:
+            return self.verdict("flag", "the moderation model", probability)
+        return None
+
+class RulePipeline:
+    def __init__(self, rules):
+        self.rules = sorted(rules, key=lambda rule: rule.cost)
+
+    async def scan(self, message):
+        """Run the rules over `message` until one is decisive. Returns its Verdict, or None."""
+        ctx = ScanContext(message)
+        for rule in self.rules:
+            started = time.perf_counter()
+            try:
+                verdict = await rule.check(ctx)
+            finally:
+                rule.checked += 1
+                rule.seconds += time.perf_counter() - started
+            if verdict is not None:
+                rule.hits += 1
+                return verdict
+        return None
+
+    def stats(self):
+        """[(name, messages checked, decisive hits, mean latency in µs)] in run order."""
+        return [
+            (rule.name, rule.checked, rule.hits, rule.seconds / rule.checked * 1e6 if rule.checked else 0.0)
+            for rule in self.rules
+        ]
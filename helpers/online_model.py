@@ -0,0 +1,118 @@
+import os, pickle, time
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from helpers.moderation_model import ONLINE_CHECKPOINT, current_rss, flagged_index
+
+# Fixed-memory moderation model that learns from moderator feedback.
+#
+# Text is hashed straight into N_FEATURES columns, so there is no vocabulary to
+# load or grow, and the classifier is a logistic regression trained with
+# SGDClassifier.partial_fit, one batch of labelled incidents at a time. Memory is
+# the weight vector (8 bytes per feature) no matter how much it has seen.
+#
+# OnlineTrainer owns the classifier and is only touched by the cog's training
+# worker. After each update it hands out an OnlineModel, an immutable copy of the
+# weights that the cog can swap in like any other model. Checkpoints pickle the
+# trainer's state together with the id of the last label it trained on, so labels
+# that arrive after the checkpoint are replayed after a restart.
+
+N_FEATURES = 2 ** 20  # hashed features; the weights take 8 MB
+CLASSES = ["FLAGGED", "OK"]
+
+VECTORIZER = HashingVectorizer(n_features=N_FEATURES, ngram_range=(1, 2), alternate_sign=False)
+
+class OnlineModel:
+    """A snapshot of the online classifier's weights."""
+    kind = "online"
+
+    def __init__(self, coef, intercept, classes, version):
+        self.coef = coef
+        self.intercept = intercept
+        self.flagged_idx = flagged_index(classes)
+        self.version = version
+        self.load_seconds = 0.0
+        self.memory_bytes = coef.nbytes
+
+    def predict(self, texts):
+        positive = 1.0 / (1.0 + np.exp(-(VECTORIZER.transform(texts) @ self.coef + self.intercept)))
+        flagged = positive if self.flagged_idx == 1 else 1.0 - positive
+        return [float(p) for p in flagged]
+
+class OnlineTrainer:
+    def __init__(self, path):
+        self.path = path
+        self.classifier = SGDClassifier(loss="log_loss", alpha=1e-5, random_state=0)
+        self.last_label_id = 0  # highest label id trained on
+        self.updates = 0
+        self.samples = 0
+        self.checkpointed_updates = 0
+
+    @classmethod
+    def load(cls, directory):
+        """The trainer checkpointed in `directory`, or a fresh one that will checkpoint there."""
+        trainer = cls(os.path.join(directory, ONLINE_CHECKPOINT))
+        try:
+            with open(trainer.path, "rb") as f:
+                state = pickle.load(f)
+        except FileNotFoundError:
+            return trainer
+        trainer.classifier = state["classifier"]
+        trainer.last_label_id = state["last_label_id"]
+        trainer.updates = trainer.checkpointed_updates = state["updates"]
+        trainer.samples = state["samples"]
+        return trainer
+
+    @property
+    def fitted(self):
+        return hasattr(self.classifier, "coef_")
+
+    @property
+    def dirty(self):
+        return self.updates != self.checkpointed_updates
+
+    def partial_fit(self, texts, flagged, last_label_id):
+        """One update from `texts` and whether each one deserved its flag."""
+        X = VECTORIZER.transform(texts)
+        y = ["FLAGGED" if f else "OK" for f in flagged]
+        self.classifier.partial_fit(X, y, classes=CLASSES)
+        self.last_label_id = last_label_id
+        self.updates += 1
+        self.samples += len(texts)
+
+    def snapshot(self):
+        """An OnlineModel with the current weights. Refused before the first update, when every score would be 0.5."""
+        if not self.fitted:
+            raise ValueError("the online model hasn't been trained on any labels yet")
+        return OnlineModel(
+            self.classifier.coef_[0].copy(), float(self.classifier.intercept_[0]),
+            list(self.classifier.classes_), f"online-{self.updates}"
+        )
+
+    def checkpoint(self):
+        """Write the trainer's state next to the old checkpoint and swap it in atomically."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        state = {
+            "classifier": self.classifier,
+            "last_label_id": self.last_label_id,
+            "updates": self.updates,
+            "samples": self.samples,
+        }
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        self.checkpointed_updates = state["updates"]
+
+def load_online(directory, version=None):
+    """The latest checkpointed weights in `directory` as a model."""
+    started = time.perf_counter()
+    rss_before = current_rss()
+    model = OnlineTrainer.load(directory).snapshot()
+    if version is not None:
+        model.version = version
+    model.load_seconds = time.perf_counter() - started
+    model.memory_bytes = max(model.memory_bytes, current_rss() - rss_before)
+    return model
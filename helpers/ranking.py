@@ -0,0 +1,104 @@
+from array import array
+from bisect import bisect_left, bisect_right, insort
+
+# In-memory order statistics over a multiset of integer scores.
+#
+# Scores live in sorted buckets of roughly LOAD values (compact 'q' arrays), with
+# a Fenwick tree over the bucket sizes. Finding a bucket is a bisect over the
+# bucket maxima and counting everything after it is a Fenwick prefix sum, so
+# "how many scores are greater than x" is O(log n) and an update costs one
+# insertion into a bucket of at most 2 * LOAD values.
+
+LOAD = 1000
+
+class RankIndex:
+    def __init__(self, scores=()):
+        values = sorted(scores)
+        self.buckets = [array("q", values[i:i + LOAD]) for i in range(0, len(values), LOAD)]
+        self.maxes = [bucket[-1] for bucket in self.buckets]
+        self.size = len(values)
+        self._build_tree()
+
+    def __len__(self):
+        return self.size
+
+    def _build_tree(self):
+        tree = [0] * (len(self.buckets) + 1)
+        for i, bucket in enumerate(self.buckets, start=1):
+            tree[i] += len(bucket)
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self.tree = tree
+
+    def _tree_add(self, i, delta):
+        i += 1
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, i):
+        """Number of scores in buckets[:i]."""
+        total = 0
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def add(self, score):
+        if not self.buckets:
+            self.buckets = [array("q", [score])]
+            self.maxes = [score]
+            self.size = 1
+            self._build_tree()
+            return
+        i = bisect_left(self.maxes, score)
+        if i == len(self.buckets):
+            i -= 1
+        bucket = self.buckets[i]
+        insort(bucket, score)
+        self.maxes[i] = bucket[-1]
+        self.size += 1
+        if len(bucket) > 2 * LOAD:
+            self.buckets[i:i + 1] = [bucket[:LOAD], bucket[LOAD:]]
+            self.maxes[i:i + 1] = [self.buckets[i][-1], self.buckets[i + 1][-1]]
+            self._build_tree()
+        else:
+            self._tree_add(i, 1)
+
+    def discard(self, score):
+        """Remove one occurrence of `score`. Returns False if it wasn't there."""
+        i = bisect_left(self.maxes, score)
+        if i == len(self.buckets):
+            return False
+        bucket = self.buckets[i]
+        j = bisect_left(bucket, score)
+        if j == len(bucket) or bucket[j] != score:
+            return False
+        del bucket[j]
+        self.size -= 1
+        if bucket:
+            self.maxes[i] = bucket[-1]
+            self._tree_add(i, -1)
+        else:
+            del self.buckets[i]
+            del self.maxes[i]
+            self._build_tree()
+        return True
+
+    def count_greater(self, score):
+        """Number of scores strictly greater than `score`."""
+        i = bisect_right(self.maxes, score)
+        if i == len(self.buckets):
+            return 0
+        bucket = self.buckets[i]
+        within = len(bucket) - bisect_right(bucket, score)
+        return self.size - self._prefix(i + 1) + within
+
+    def next_greater(self, score):
+        """The smallest score strictly greater than `score`, or None."""
+        i = bisect_right(self.maxes, score)
+        if i == len(self.buckets):
+            return None
+        bucket = self.buckets[i]
+        return bucket[bisect_right(bucket, score)]
@@ -0,0 +1,168 @@
+import asyncio, heapq, json, os, time
+from datetime import datetime
+
+# Persistent deadline scheduler shared by the cogs.
+#
+# Jobs are named, have a due time (unix seconds), a kind and a JSON-serialisable
+# payload. Cogs register one handler per kind and schedule/cancel jobs by name;
+# scheduling a name that already exists moves it. The whole job table is saved to
+# data/scheduler.json on every change, so jobs that came due while the bot was
+# down run as soon as their handler is registered again after a restart.
+# One task sleeps until the earliest deadline and is woken early when a sooner
+# job is added.
+# A job stays in the table (and on disk) while its handler runs and is only removed
+# once the handler has finished, so a crash mid-run means it runs again after the
+# restart. A handler that raises is retried with backoff, up to MAX_ATTEMPTS runs.
+
+MAX_ATTEMPTS = 5
+RETRY_DELAY = 60  # seconds before the first retry; doubles with every failed run
+
+class Scheduler:
+    def __init__(self, bot, path="data/scheduler.json"):
+        self.bot = bot
+        self.path = path
+        self.jobs = {}  # name -> {"due": float, "kind": str, "payload": ...}
+        self.heap = []  # (due, name); entries that no longer match self.jobs are skipped
+        self.handlers = {}
+        self.running = {}  # name -> job whose handler is running now
+        self.job_tasks = set()  # running handler tasks, referenced so they aren't garbage collected
+        self.wakeup = asyncio.Event()
+        self.task = None
+        self.stats = {"run": 0, "failed": 0}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "r") as f:
+                self.jobs = json.load(f)
+        except FileNotFoundError:
+            self.jobs = {}
+        except json.JSONDecodeError as e:
+            print(f"Failed to read {self.path}, starting with no jobs: {e}")
+            self.jobs = {}
+        self.heap = [(job["due"], name) for name, job in self.jobs.items()]
+        heapq.heapify(self.heap)
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.jobs, f, indent=4)
+        os.replace(tmp_path, self.path)
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    def register(self, kind, handler):
+        """Set the coroutine `handler(name, payload)` that runs jobs of this kind."""
+        self.handlers[kind] = handler
+        self.wakeup.set()
+
+    def schedule(self, name, due, kind, payload=None):
+        """Schedule (or move) job `name` to run at `due` (unix seconds or an aware datetime)."""
+        if isinstance(due, datetime):
+            due = due.timestamp()
+        self.jobs[name] = {"due": due, "kind": kind, "payload": payload}
+        heapq.heappush(self.heap, (due, name))
+        if len(self.heap) > 2 * len(self.jobs) + 64:
+            # Drop the entries left behind by moved and cancelled jobs.
+            self.heap = [(job["due"], job_name) for job_name, job in self.jobs.items()]
+            heapq.heapify(self.heap)
+        self.save()
+        self.wakeup.set()
+
+    def cancel(self, name):
+        """Cancel job `name`. Returns True if it existed."""
+        if self.jobs.pop(name, None) is None:
+            return False
+        self.save()
+        return True
+
+    def get(self, name):
+        return self.jobs.get(name)
+
+    def _peek(self):
+        """Return the earliest live (due, name) whose handler is registered, or None."""
+        waiting = []
+        found = None
+        while self.heap:
+            due, name = self.heap[0]
+            job = self.jobs.get(name)
+            if job is None or job["due"] != due or self.running.get(name) is job:
+                heapq.heappop(self.heap)
+                continue
+            if job["kind"] not in self.handlers:
+                # Keep it for when the handler is registered.
+                waiting.append(heapq.heappop(self.heap))
+                continue
+            found = (due, name)
+            break
+        for entry in waiting:
+            heapq.heappush(self.heap, entry)
+        return found
+
+    def next_wake(self):
+        """Unix time the scheduler will next wake up for, or None if nothing is runnable."""
+        entry = self._peek()
+        return entry[0] if entry else None
+
+    async def run(self):
+        await self.bot.wait_until_ready()
+        while not self.bot.is_closed():
+            self.wakeup.clear()
+            entry = self._peek()
+            now = time.time()
+            if entry is not None and entry[0] <= now:
+                # Its heap entry is skipped by _peek while the job is running.
+                due, name = entry
+                job = self.jobs[name]
+                self.running[name] = job
+                task = asyncio.create_task(self._run_job(name, job))
+                self.job_tasks.add(task)
+                task.add_done_callback(self.job_tasks.discard)
+                continue
+            timeout = entry[0] - now if entry is not None else None
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run_job(self, name, job):
+        try:
+            await self.handlers[job["kind"]](name, job["payload"])
+            self.stats["run"] += 1
+            failed = False
+        except asyncio.CancelledError:
+            # Left in the table; put it back on the heap so it runs again.
+            heapq.heappush(self.heap, (job["due"], name))
+            raise
+        except Exception as e:
+            self.stats["failed"] += 1
+            print(f"Scheduled job {name} failed: {e}")
+            failed = True
+        finally:
+            if self.running.get(name) is job:
+                del self.running[name]
+        # A handler may have moved or cancelled its own job; only the run that finished is settled here.
+        if self.jobs.get(name) is not job:
+            return
+        attempts = job.get("attempts", 0) + 1
+        if failed and attempts < MAX_ATTEMPTS:
+            retry = {**job, "due": time.time() + RETRY_DELAY * 2 ** (attempts - 1), "attempts": attempts}
+            self.jobs[name] = retry
+            heapq.heappush(self.heap, (retry["due"], name))
+            self.wakeup.set()
+        else:
+            if failed:
+                print(f"Giving up on scheduled job {name} after {attempts} attempts.")
+            del self.jobs[name]
+        self.save()
+
+def get_scheduler(bot):
+    """Return the bot's shared Scheduler, creating and starting it on first use."""
+    scheduler = getattr(bot, "scheduler", None)
+    if scheduler is None:
+        scheduler = Scheduler(bot)
+        bot.scheduler = scheduler
+    scheduler.start()
+    return scheduler
@@ -0,0 +1,124 @@
+import os, re
+
+# Compiled multi-term word filter.
+#
+# A regex alternation of every term is retried term by term at each position, so
+# it slows down with the length of the list. WordFilter builds a character trie of
+# the terms once, and matching only starts a walk at word boundaries followed by
+# a character some term starts with, since that's the only place a \b-delimited
+# term can begin. Finding those is one regex scan, and each walk is as long as
+# the longest term prefix that matches there, however many terms there are.
+#
+# Semantics follow r'\b(term|...)\b' with re.IGNORECASE: a match has to start and
+# end on a \b boundary of the original text, letters are compared lower-cased,
+# matches don't overlap and the scan resumes after each one. Where terms overlap
+# the longest one that ends on a boundary wins ("spam link" over "spam").
+#
+# A WordFilter never changes after it is built; WordList rebuilds one when the
+# file behind it changes, and callers swap the reference.
+
+BOUNDARY = re.compile(r"\b")
+TERMINAL = ""  # trie key marking the end of a term; no real character is ""
+
+def fold(text):
+    """Lower-case `text` without changing its length, so positions stay those of the original."""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    # A few characters lower-case to two ('İ'); those are compared as they are.
+    return "".join(c if len(c.lower()) != 1 else c.lower() for c in text)
+
+class WordFilter:
+    def __init__(self, terms=()):
+        root = {}
+        unique = []
+        for term in terms:
+            term = term.strip()
+            if not term:
+                continue
+            node = root
+            for c in fold(term):
+                node = node.setdefault(c, {})
+            if TERMINAL not in node:
+                node[TERMINAL] = True
+                unique.append(term)
+        self.root = root
+        self.terms = tuple(unique)
+        # Word boundaries followed by a character some term starts with: where walks begin.
+        first = "".join(re.escape(c) for c in sorted(root))
+        self.starts = re.compile(rf"\b(?=[{first}])") if root else None
+
+    def __len__(self):
+        return len(self.terms)
+
+    def spans(self, text):
+        """(start, end) of every match in `text`, left to right."""
+        if self.starts is None or not text:
+            return []
+        root = self.root
+        folded = fold(text)
+        n = len(folded)
+        at_boundary = BOUNDARY.match
+        spans = []
+        resume = 0
+        for start in self.starts.finditer(folded):
+            i = start.start()
+            if i < resume:
+                continue
+            node = root
+            end = -1
+            k = i
+            while k < n:
+                node = node.get(folded[k])
+                if node is None:
+                    break
+                k += 1
+                if TERMINAL in node and at_boundary(text, k):
+                    end = k
+            if end != -1:
+                spans.append((i, end))
+                resume = end
+        return spans
+
+    def search(self, text):
+        """Whether `text` contains any of the terms."""
+        return bool(self.spans(text))
+
+    def sub(self, repl, text):
+        """`text` with every match replaced by `repl`, like re.sub."""
+        spans = self.spans(text)
+        if not spans:
+            return text
+        parts = []
+        last = 0
+        for start, end in spans:
+            parts.append(text[last:start])
+            parts.append(repl)
+            last = end
+        parts.append(text[last:])
+        return "".join(parts)
+
+def load_terms(path):
+    """Terms from a text file, one per line; blank lines and lines starting with # are skipped."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+class WordList:
+    """A term list file and the WordFilter built from it, rebuilt when the file changes."""
+    def __init__(self, path, default_terms=()):
+        self.path = path
+        self.default_terms = tuple(default_terms)  # used while the file doesn't exist
+        self.mtime = None
+        self.filter = WordFilter(default_terms)
+
+    def reload_if_changed(self):
+        """Rebuild the filter if the file changed since the last call. Returns the new filter or None."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self.mtime:
+            return None
+        self.mtime = mtime
+        self.filter = WordFilter(load_terms(self.path) if mtime is not None else self.default_terms)
+        return self.filter